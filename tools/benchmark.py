@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+import abis
+import argparse
+import contextlib
+import get_names
+import itertools
+import json
+from labelfile import HEADER
+import logging
+import migrate
+from mocknode import AUCTION_REGISTRAR_ADDRESS, BASE_REGISTRAR_ADDRESS, MIGRATION_ADDRESS, MULTICALL_ADDRESS, NEW_REGISTRAR_ADDRESS
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from web3 import HTTPProvider
+
+"""
+Measures the throughput of migrate.py and get_names.py against a mock node.
+
+Usage:
+
+  python3 benchmark.py --sizes 10000,100000,1000000 --parallelism 10,50 --rpcbatch 0,100 --latency 0.05
+
+For each label set size, starts `mocknode.py` in a subprocess, with the given
+`--latency`, `--jitter` and `--errors`, and writes a packed label list of that
+many random label hashes. It then times each of the `--paths` below, once for
+each combination of `--parallelism` and `--rpcbatch` given:
+
+ - 'categorise': `categorise_labels` over the whole list, as `verify` does.
+ - 'dryrun': `migrate --dryrun`, categorising the list and estimating gas for
+   every batch.
+ - 'getlogs': `scan_raw_logs`, as get_names.py uses it, over as many
+   BidRevealed logs as there are labels, fetched `--blocks` blocks at a time.
+ - 'verifylogs': `verify --fromlogs`, scanning registrar logs for the state of
+   every label and calling the registrars only for those the logs leave in doubt.
+
+Results are printed as a table of labels (or logs) per second, with the number
+of HTTP requests and JSON-RPC calls the node served, and written to `--output`
+as JSON if given. The mock node is a single Python process, so at high
+parallelism and no latency it will be the bottleneck; set `--latency` to
+something like a real node's to measure the tools rather than the mock.
+"""
+
+# Blocks the mock node spreads its logs over
+LOG_BLOCKS = 20000
+
+
+def int_list(s):
+    return [int(x) for x in s.split(',')]
+
+
+def write_labels(path, count, seed=0):
+    rng = random.Random(seed)
+    with open(path, 'wb') as f:
+        f.write(HEADER)
+        for i in range(count):
+            f.write(rng.getrandbits(256).to_bytes(32, 'big'))
+
+
+class NodeProcess:
+    """Runs mocknode.py in a subprocess on a free port."""
+    def __init__(self, args, logs, labels):
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mocknode.py'),
+             '--port', '0',
+             '--latency', str(args.latency),
+             '--jitter', str(args.jitter),
+             '--errors', str(args.errors),
+             '--logs', str(logs),
+             '--labels', labels,
+             '--blocks', str(LOG_BLOCKS)],
+            stdout=subprocess.PIPE, universal_newlines=True)
+        line = self.process.stdout.readline()
+        match = re.search(r'(http://\S+)', line)
+        if match is None:
+            self.close()
+            raise RuntimeError("Mock node failed to start")
+        self.uri = match.group(1)
+
+    def stats(self):
+        with urllib.request.urlopen(self.uri) as response:
+            return json.loads(response.read())
+
+    def close(self):
+        self.process.terminate()
+        self.process.wait()
+
+
+def bench_categorise(args, node, path, size, parallelism, rpcbatch):
+    fetcher = migrate.Fetcher(node.uri, parallelism)
+    count = 0
+    for entry in migrate.categorise_labels(fetcher, migrate.open_labels(path), rpcbatch):
+        count += 1
+    return count
+
+
+def bench_dryrun(args, node, path, size, parallelism, rpcbatch):
+    fetcher = migrate.Fetcher(node.uri, parallelism)
+    migrateArgs = migrate.parser.parse_args(
+        ['--dryrun', '--parallelism', str(parallelism), '--rpcbatch', str(rpcbatch), MIGRATION_ADDRESS, path, 'migrate'])
+    migrateArgs.start = 0
+    if migrate.plan(migrateArgs, fetcher, migrate.open_labels(path), None) != 0:
+        raise RuntimeError("Dry run failed")
+    return size
+
+
+def bench_getlogs(args, node, path, size, parallelism, rpcbatch):
+    fetcher = migrate.Fetcher(node.uri, parallelism)
+    count = 0
+    for log in get_names.scan_raw_logs(fetcher, [(AUCTION_REGISTRAR_ADDRESS, get_names.BID_REVEALED, 1, LOG_BLOCKS + 1)], args.blocks):
+        count += 1
+    return count
+
+
+def bench_verifylogs(args, node, path, size, parallelism, rpcbatch):
+    fetcher = migrate.Fetcher(node.uri, parallelism)
+    verifyArgs = migrate.parser.parse_args(
+        ['--rpcbatch', str(rpcbatch), MIGRATION_ADDRESS, path, 'verify', '--fromlogs', '--blocks', str(args.blocks), '--logparallelism', str(parallelism)])
+    # Don't time printing every unmigrated label
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        migrate.verify_from_logs(verifyArgs, fetcher, migrate.open_labels(path), None)
+    return size
+
+
+BENCHMARKS = {
+    'categorise': bench_categorise,
+    'dryrun': bench_dryrun,
+    'getlogs': bench_getlogs,
+    'verifylogs': bench_verifylogs,
+}
+
+
+def setup(node, multicall):
+    """Points migrate.py and get_names.py at `node`."""
+    migrate.w3.provider = HTTPProvider(node.uri)
+    contracts = [
+        ('registrarMigration', MIGRATION_ADDRESS, abis.REGISTRAR_MIGRATION_ABI),
+        ('auctionRegistrar', AUCTION_REGISTRAR_ADDRESS, abis.AUCTION_REGISTRAR_ABI),
+        ('baseRegistrar', BASE_REGISTRAR_ADDRESS, abis.BASE_REGISTRAR_ABI),
+        ('newRegistrar', NEW_REGISTRAR_ADDRESS, abis.BASE_REGISTRAR_ABI),
+    ]
+    if multicall:
+        contracts.append(('multicall', MULTICALL_ADDRESS, abis.MULTICALL_ABI))
+    migrate.init_contracts(contracts)
+
+
+def run(args, size, path, results):
+    node = NodeProcess(args, size, path)
+    try:
+        setup(node, args.multicall)
+        for name in args.paths:
+            # Log scans don't batch, so only vary with parallelism
+            rpcbatches = args.rpcbatch if name != 'getlogs' else [0]
+            for parallelism, rpcbatch in itertools.product(args.parallelism, rpcbatches):
+                before = node.stats()
+                started = time.time()
+                count = BENCHMARKS[name](args, node, path, size, parallelism, rpcbatch)
+                elapsed = time.time() - started
+                after = node.stats()
+                result = {
+                    'path': name,
+                    'size': size,
+                    'parallelism': parallelism,
+                    'rpcbatch': rpcbatch,
+                    'count': count,
+                    'seconds': elapsed,
+                    'rate': count / elapsed,
+                    'requests': after['requests'] - before['requests'],
+                    'calls': after['calls'] - before['calls'],
+                    'errors': after['errors'] - before['errors'],
+                }
+                results.append(result)
+                print_result(result)
+    finally:
+        node.close()
+
+
+def print_header():
+    print("%-10s %8s %5s %6s %9s %10s %9s %9s %6s" % ('path', 'size', 'par', 'batch', 'seconds', 'per sec', 'requests', 'calls', 'errors'), flush=True)
+
+
+def print_result(result):
+    print("%-10s %8d %5d %6d %9.2f %10.1f %9d %9d %6d" % (
+        result['path'], result['size'], result['parallelism'], result['rpcbatch'], result['seconds'], result['rate'],
+        result['requests'], result['calls'], result['errors']), flush=True)
+
+
+parser = argparse.ArgumentParser(description="Benchmark migrate.py and get_names.py against a mock node")
+parser.add_argument('--sizes', type=int_list, default=[10000, 100000, 1000000], help="Comma separated label set sizes to benchmark")
+parser.add_argument('--paths', type=lambda s: s.split(','), default=list(BENCHMARKS), help="Comma separated paths to benchmark, of %s" % (', '.join(BENCHMARKS),))
+parser.add_argument('--parallelism', type=int_list, default=[50], help="Comma separated values of --parallelism to benchmark")
+parser.add_argument('--rpcbatch', type=int_list, default=[0], help="Comma separated values of --rpcbatch to benchmark")
+parser.add_argument('--multicall', default=False, action='store_true', help="Aggregate batched reads through the mock Multicall contract")
+parser.add_argument('--blocks', type=int, default=5000, help="Number of blocks to request logs for at once")
+parser.add_argument('--latency', type=float, default=0, help="Seconds the mock node delays each request by")
+parser.add_argument('--jitter', type=float, default=0, help="Maximum random variation in the mock node's delay, in seconds")
+parser.add_argument('--errors', type=float, default=0, help="Fraction of requests the mock node fails")
+parser.add_argument('--output', type=str, default=None, help="File to write the results to, as JSON")
+
+
+def main(args):
+    for name in args.paths:
+        if name not in BENCHMARKS:
+            parser.error("Unknown path %s" % (name,))
+    results = []
+    print_header()
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            path = os.path.join(tmp, 'labels-%d.bin' % (size,))
+            write_labels(path, size)
+            run(args, size, path, results)
+            os.unlink(path)
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    main(parser.parse_args())
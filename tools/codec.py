@@ -0,0 +1,113 @@
+from eth_utils import function_signature_to_4byte_selector, to_canonical_address
+
+"""
+Encodes and decodes calldata for the registrar calls migrate.py makes per label.
+
+Going through a web3 contract function for every `nameExpires` or `entries`
+call costs an ABI lookup, argument normalisation and a generic decode each
+time. The arguments and results of these functions have fixed layouts, so this
+module builds and parses them directly from precomputed selectors and 32 byte
+words. Encoders return hex strings, as `Contract.encodeABI` does, so they can be
+passed straight to `eth_call`; decoders accept the raw bytes of a result.
+"""
+
+NAME_EXPIRES = function_signature_to_4byte_selector('nameExpires(uint256)')
+ENTRIES = function_signature_to_4byte_selector('entries(bytes32)')
+AGGREGATE = function_signature_to_4byte_selector('aggregate((address,bytes)[])')
+MIGRATE_ALL = function_signature_to_4byte_selector('migrateAll(uint256[])')
+MIGRATE_ALL_LEGACY = function_signature_to_4byte_selector('migrateAllLegacy(bytes32[])')
+
+WORD = 32
+
+
+def _hex(data):
+    return '0x' + data.hex()
+
+
+def _word(n):
+    return n.to_bytes(WORD, byteorder='big')
+
+
+def _uint(data, offset=0):
+    if len(data) < offset + WORD:
+        raise ValueError("Expected at least %d bytes of return data, got %d" % (offset + WORD, len(data)))
+    return int.from_bytes(data[offset:offset + WORD], byteorder='big')
+
+
+def _pad(data):
+    return data + b'\0' * (-len(data) % WORD)
+
+
+def _label(label):
+    if len(label) != WORD:
+        raise ValueError("Label hashes must be 32 bytes, got %d" % (len(label),))
+    return bytes(label)
+
+
+def name_expires(label):
+    """Returns calldata for `nameExpires(uint256)` on the label hash `label`."""
+    # A label hash read as a big-endian uint256 encodes to the same 32 bytes
+    return _hex(NAME_EXPIRES + _label(label))
+
+
+def entries(label):
+    """Returns calldata for the auction registrar's `entries(bytes32)` on `label`."""
+    return _hex(ENTRIES + _label(label))
+
+
+def decode_uint(data):
+    """Decodes a single uint256 return value, such as that of `nameExpires`."""
+    return _uint(data)
+
+
+def decode_entry_mode(data):
+    """Returns the mode from the (uint8, address, uint256, uint256, uint256) tuple `entries` returns."""
+    if len(data) < 5 * WORD:
+        raise ValueError("Expected %d bytes of return data, got %d" % (5 * WORD, len(data)))
+    return _uint(data)
+
+
+def _label_array(selector, labels):
+    labels = [_label(label) for label in labels]
+    return _hex(selector + _word(WORD) + _word(len(labels)) + b''.join(labels))
+
+
+def migrate_all(labels):
+    """Returns calldata for `migrateAll(uint256[])` on a sequence of 32 byte label hashes."""
+    return _label_array(MIGRATE_ALL, labels)
+
+
+def migrate_all_legacy(labels):
+    """Returns calldata for `migrateAllLegacy(bytes32[])` on a sequence of 32 byte label hashes."""
+    return _label_array(MIGRATE_ALL_LEGACY, labels)
+
+
+def aggregate(calls):
+    """Returns calldata for Multicall's `aggregate` on a list of (address, calldata) pairs, with hex calldata."""
+    heads = []
+    tails = []
+    offset = len(calls) * WORD
+    for address, data in calls:
+        data = bytes.fromhex(data[2:] if data.startswith('0x') else data)
+        # Each (address, bytes) tuple is the address, the offset of the bytes
+        # within the tuple, then the bytes' length and padded contents
+        tail = to_canonical_address(address).rjust(WORD, b'\0') + _word(2 * WORD) + _word(len(data)) + _pad(data)
+        heads.append(_word(offset))
+        tails.append(tail)
+        offset += len(tail)
+    return _hex(AGGREGATE + _word(WORD) + _word(len(calls)) + b''.join(heads) + b''.join(tails))
+
+
+def decode_aggregate(data):
+    """Decodes the (uint256 blockNumber, bytes[] returnData) result of `aggregate`, returning a list of bytes."""
+    start = _uint(data, WORD)
+    count = _uint(data, start)
+    start += WORD
+    results = []
+    for i in range(count):
+        offset = start + _uint(data, start + i * WORD)
+        length = _uint(data, offset)
+        if len(data) < offset + WORD + length:
+            raise ValueError("Return data %d of %d is truncated" % (i, count))
+        results.append(bytes(data[offset + WORD:offset + WORD + length]))
+    return results
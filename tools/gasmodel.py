@@ -0,0 +1,73 @@
+"""
+Sizes migration batches to a target amount of gas.
+
+The gas used by a `migrateAll` or `migrateAllLegacy` call is modelled as
+`base + perLabel * n` for a batch of `n` labels. `GasModel` fits those two
+parameters to the gas estimates of the batches sent so far, weighting recent
+estimates more heavily, and `BatchPacker` keeps one model per registrar kind and
+uses it to choose how many labels to put in the next batch.
+"""
+
+# Assumed fixed cost of a batch transaction until estimates of differently
+# sized batches let us fit it
+DEFAULT_BASE_GAS = 50000
+
+
+class GasModel:
+    def __init__(self, decay=0.95):
+        self.decay = decay
+        self.weight = 0.0
+        self.sumN = 0.0
+        self.sumGas = 0.0
+        self.sumNN = 0.0
+        self.sumNGas = 0.0
+
+    def observe(self, n, gas):
+        d = self.decay
+        self.weight = self.weight * d + 1
+        self.sumN = self.sumN * d + n
+        self.sumGas = self.sumGas * d + gas
+        self.sumNN = self.sumNN * d + n * n
+        self.sumNGas = self.sumNGas * d + n * gas
+
+    def parameters(self):
+        """Returns the current (base, perLabel) estimate, or None if nothing has been observed yet."""
+        if self.weight == 0:
+            return None
+        meanN = self.sumN / self.weight
+        meanGas = self.sumGas / self.weight
+        varN = self.sumNN / self.weight - meanN * meanN
+        if varN > 1:
+            perLabel = (self.sumNGas / self.weight - meanN * meanGas) / varN
+            base = meanGas - perLabel * meanN
+            if perLabel > 0 and base >= 0:
+                return (base, perLabel)
+        # Not enough spread in batch sizes to fit both parameters; assume the base cost
+        base = min(DEFAULT_BASE_GAS, meanGas / 2)
+        return (base, (meanGas - base) / meanN)
+
+    def predict(self, n):
+        base, perLabel = self.parameters()
+        return base + perLabel * n
+
+
+class BatchPacker:
+    def __init__(self, blockGasLimit, fraction, initialSize, maxSize):
+        self.blockGasLimit = blockGasLimit
+        self.target = int(blockGasLimit * fraction)
+        # Batches whose estimate overshoots the target by this much are split
+        self.limit = min(int(self.target * 1.25), int(blockGasLimit * 0.95))
+        self.initialSize = initialSize
+        self.maxSize = maxSize
+        self.models = {}
+
+    def observe(self, kind, n, gas):
+        self.models.setdefault(kind, GasModel()).observe(n, gas)
+
+    def size(self, kind):
+        """Returns the number of labels of `kind` expected to fill a batch to the target gas."""
+        model = self.models.get(kind)
+        if model is None:
+            return self.initialSize
+        base, perLabel = model.parameters()
+        return max(1, min(self.maxSize, int((self.target - base) / perLabel)))
@@ -1,13 +1,16 @@
+import abis
 import argparse
 from binascii import unhexlify
 import csv
 from ens.utils import label_to_hash
-from eth_utils import remove_0x_prefix
+from eth_abi import decode_abi
+from eth_utils import event_signature_to_log_topic, remove_0x_prefix
 from hexbytes import HexBytes
-import itertools
 import json
+from labelmerge import DEFAULT_MEMORY, difference, parse_size, sort_unique
 import logging
 import os
+from rpc import Fetcher, RPCError
 import web3
 from web3.auto import w3
 
@@ -22,41 +25,128 @@ Usage:
 Provide the address of the ENS registry on the chain that you are querying. The
 tool will use this to determine a list of registrars that have been used on .eth,
 and query events from each for names that were registered there.
-"""
-
-ZERO_HASH = HexBytes('0000000000000000000000000000000000000000000000000000000000000000')
 
-AUCTION_REGISTRAR_ABI = json.loads('''[{"constant":false,"inputs":[{"name":"_hash","type":"bytes32"}],"name":"releaseDeed","outputs":[],"payable":false,"type":"function"},{"constant":true,"inputs":[{"name":"_hash","type":"bytes32"}],"name":"getAllowedTime","outputs":[{"name":"timestamp","type":"uint256"}],"payable":false,"type":"function"},{"constant":false,"inputs":[{"name":"unhashedName","type":"string"}],"name":"invalidateName","outputs":[],"payable":false,"type":"function"},{"constant":true,"inputs":[{"name":"hash","type":"bytes32"},{"name":"owner","type":"address"},{"name":"value","type":"uint256"},{"name":"salt","type":"bytes32"}],"name":"shaBid","outputs":[{"name":"sealedBid","type":"bytes32"}],"payable":false,"type":"function"},{"constant":false,"inputs":[{"name":"bidder","type":"address"},{"name":"seal","type":"bytes32"}],"name":"cancelBid","outputs":[],"payable":false,"type":"function"},{"constant":true,"inputs":[{"name":"_hash","type":"bytes32"}],"name":"entries","outputs":[{"name":"","type":"uint8"},{"name":"","type":"address"},{"name":"","type":"uint256"},{"name":"","type":"uint256"},{"name":"","type":"uint256"}],"payable":false,"type":"function"},{"constant":true,"inputs":[],"name":"ens","outputs":[{"name":"","type":"address"}],"payable":false,"type":"function"},{"constant":false,"inputs":[{"name":"_hash","type":"bytes32"},{"name":"_value","type":"uint256"},{"name":"_salt","type":"bytes32"}],"name":"unsealBid","outputs":[],"payable":false,"type":"function"},{"constant":false,"inputs":[{"name":"_hash","type":"bytes32"}],"name":"transferRegistrars","outputs":[],"payable":false,"type":"function"},{"constant":true,"inputs":[{"name":"","type":"address"},{"name":"","type":"bytes32"}],"name":"sealedBids","outputs":[{"name":"","type":"address"}],"payable":false,"type":"function"},{"constant":true,"inputs":[{"name":"_hash","type":"bytes32"}],"name":"state","outputs":[{"name":"","type":"uint8"}],"payable":false,"type":"function"},{"constant":false,"inputs":[{"name":"_hash","type":"bytes32"},{"name":"newOwner","type":"address"}],"name":"transfer","outputs":[],"payable":false,"type":"function"},{"constant":true,"inputs":[{"name":"_hash","type":"bytes32"},{"name":"_timestamp","type":"uint256"}],"name":"isAllowed","outputs":[{"name":"allowed","type":"bool"}],"payable":false,"type":"function"},{"constant":false,"inputs":[{"name":"_hash","type":"bytes32"}],"name":"finalizeAuction","outputs":[],"payable":false,"type":"function"},{"constant":true,"inputs":[],"name":"registryStarted","outputs":[{"name":"","type":"uint256"}],"payable":false,"type":"function"},{"constant":true,"inputs":[],"name":"launchLength","outputs":[{"name":"","type":"uint32"}],"payable":false,"type":"function"},{"constant":false,"inputs":[{"name":"sealedBid","type":"bytes32"}],"name":"newBid","outputs":[],"payable":true,"type":"function"},{"constant":false,"inputs":[{"name":"labels","type":"bytes32[]"}],"name":"eraseNode","outputs":[],"payable":false,"type":"function"},{"constant":false,"inputs":[{"name":"_hashes","type":"bytes32[]"}],"name":"startAuctions","outputs":[],"payable":false,"type":"function"},{"constant":false,"inputs":[{"name":"hash","type":"bytes32"},{"name":"deed","type":"address"},{"name":"registrationDate","type":"uint256"}],"name":"acceptRegistrarTransfer","outputs":[],"payable":false,"type":"function"},{"constant":false,"inputs":[{"name":"_hash","type":"bytes32"}],"name":"startAuction","outputs":[],"payable":false,"type":"function"},{"constant":true,"inputs":[],"name":"rootNode","outputs":[{"name":"","type":"bytes32"}],"payable":false,"type":"function"},{"constant":false,"inputs":[{"name":"hashes","type":"bytes32[]"},{"name":"sealedBid","type":"bytes32"}],"name":"startAuctionsAndBid","outputs":[],"payable":true,"type":"function"},{"inputs":[{"name":"_ens","type":"address"},{"name":"_rootNode","type":"bytes32"},{"name":"_startDate","type":"uint256"}],"payable":false,"type":"constructor"},{"anonymous":false,"inputs":[{"indexed":true,"name":"hash","type":"bytes32"},{"indexed":false,"name":"registrationDate","type":"uint256"}],"name":"AuctionStarted","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"hash","type":"bytes32"},{"indexed":true,"name":"bidder","type":"address"},{"indexed":false,"name":"deposit","type":"uint256"}],"name":"NewBid","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"hash","type":"bytes32"},{"indexed":true,"name":"owner","type":"address"},{"indexed":false,"name":"value","type":"uint256"},{"indexed":false,"name":"status","type":"uint8"}],"name":"BidRevealed","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"hash","type":"bytes32"},{"indexed":true,"name":"owner","type":"address"},{"indexed":false,"name":"value","type":"uint256"},{"indexed":false,"name":"registrationDate","type":"uint256"}],"name":"HashRegistered","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"hash","type":"bytes32"},{"indexed":false,"name":"value","type":"uint256"}],"name":"HashReleased","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"hash","type":"bytes32"},{"indexed":true,"name":"name","type":"string"},{"indexed":false,"name":"value","type":"uint256"},{"indexed":false,"name":"registrationDate","type":"uint256"}],"name":"HashInvalidated","type":"event"}]''')
+Logs are fetched in ranges of `--blocks` blocks, with up to `--parallelism`
+requests in flight across all registrars at once. Ranges the node rejects for
+returning too many results are split in half and retried. Logs are requested
+with plain `eth_getLogs` filters covering every registrar active over a range at
+once, and label hashes are read straight from their topics rather than by
+decoding them against the registrar ABIs.
 
-BASE_REGISTRAR_ABI = json.loads('''[{"constant":true,"inputs":[{"name":"interfaceID","type":"bytes4"}],"name":"supportsInterface","outputs":[{"name":"","type":"bool"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[{"name":"tokenId","type":"uint256"}],"name":"getApproved","outputs":[{"name":"","type":"address"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[{"name":"to","type":"address"},{"name":"tokenId","type":"uint256"}],"name":"approve","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":false,"inputs":[{"name":"from","type":"address"},{"name":"to","type":"address"},{"name":"tokenId","type":"uint256"}],"name":"transferFrom","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":false,"inputs":[{"name":"id","type":"uint256"},{"name":"owner","type":"address"}],"name":"reclaim","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[],"name":"ens","outputs":[{"name":"","type":"address"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[{"name":"from","type":"address"},{"name":"to","type":"address"},{"name":"tokenId","type":"uint256"}],"name":"safeTransferFrom","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[],"name":"transferPeriodEnds","outputs":[{"name":"","type":"uint256"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[{"name":"resolver","type":"address"}],"name":"setResolver","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[{"name":"tokenId","type":"uint256"}],"name":"ownerOf","outputs":[{"name":"","type":"address"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[],"name":"MIGRATION_LOCK_PERIOD","outputs":[{"name":"","type":"uint256"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[{"name":"owner","type":"address"}],"name":"balanceOf","outputs":[{"name":"","type":"uint256"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[],"name":"renounceOwnership","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[],"name":"owner","outputs":[{"name":"","type":"address"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[],"name":"isOwner","outputs":[{"name":"","type":"bool"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[{"name":"id","type":"uint256"}],"name":"available","outputs":[{"name":"","type":"bool"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[{"name":"to","type":"address"},{"name":"approved","type":"bool"}],"name":"setApprovalForAll","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":false,"inputs":[{"name":"controller","type":"address"}],"name":"addController","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[],"name":"previousRegistrar","outputs":[{"name":"","type":"address"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[{"name":"from","type":"address"},{"name":"to","type":"address"},{"name":"tokenId","type":"uint256"},{"name":"_data","type":"bytes"}],"name":"safeTransferFrom","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[],"name":"GRACE_PERIOD","outputs":[{"name":"","type":"uint256"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[{"name":"id","type":"uint256"},{"name":"duration","type":"uint256"}],"name":"renew","outputs":[{"name":"","type":"uint256"}],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[{"name":"id","type":"uint256"}],"name":"nameExpires","outputs":[{"name":"","type":"uint256"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[{"name":"","type":"address"}],"name":"controllers","outputs":[{"name":"","type":"bool"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[],"name":"baseNode","outputs":[{"name":"","type":"bytes32"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[{"name":"owner","type":"address"},{"name":"operator","type":"address"}],"name":"isApprovedForAll","outputs":[{"name":"","type":"bool"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[{"name":"label","type":"bytes32"},{"name":"deed","type":"address"},{"name":"","type":"uint256"}],"name":"acceptRegistrarTransfer","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":false,"inputs":[{"name":"newOwner","type":"address"}],"name":"transferOwnership","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":false,"inputs":[{"name":"controller","type":"address"}],"name":"removeController","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":false,"inputs":[{"name":"id","type":"uint256"},{"name":"owner","type":"address"},{"name":"duration","type":"uint256"}],"name":"register","outputs":[{"name":"","type":"uint256"}],"payable":false,"stateMutability":"nonpayable","type":"function"},{"inputs":[{"name":"_ens","type":"address"},{"name":"_previousRegistrar","type":"address"},{"name":"_baseNode","type":"bytes32"},{"name":"_transferPeriodEnds","type":"uint256"}],"payable":false,"stateMutability":"nonpayable","type":"constructor"},{"anonymous":false,"inputs":[{"indexed":true,"name":"controller","type":"address"}],"name":"ControllerAdded","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"controller","type":"address"}],"name":"ControllerRemoved","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"id","type":"uint256"},{"indexed":true,"name":"owner","type":"address"},{"indexed":false,"name":"expires","type":"uint256"}],"name":"NameMigrated","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"id","type":"uint256"},{"indexed":true,"name":"owner","type":"address"},{"indexed":false,"name":"expires","type":"uint256"}],"name":"NameRegistered","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"id","type":"uint256"},{"indexed":false,"name":"expires","type":"uint256"}],"name":"NameRenewed","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"previousOwner","type":"address"},{"indexed":true,"name":"newOwner","type":"address"}],"name":"OwnershipTransferred","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"from","type":"address"},{"indexed":true,"name":"to","type":"address"},{"indexed":true,"name":"tokenId","type":"uint256"}],"name":"Transfer","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"owner","type":"address"},{"indexed":true,"name":"approved","type":"address"},{"indexed":true,"name":"tokenId","type":"uint256"}],"name":"Approval","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"owner","type":"address"},{"indexed":true,"name":"operator","type":"address"},{"indexed":false,"name":"approved","type":"bool"}],"name":"ApprovalForAll","type":"event"}]''')
+New labels are appended to the output file; labels it already contains are not
+written again. Both are deduplicated by sorting within `--memory` bytes,
+spilling sorted runs to disk as needed (see labelmerge.py). After each run the
+last block scanned for each registrar is recorded in a checkpoint file alongside
+the output (`<file>.checkpoint`). With `--incremental`, scanning resumes from
+those blocks rather than from `--start`. A registrar's checkpoint only advances
+when its scan began no later than the registrar's first block or its previous
+checkpoint, so a run with a later `--start` never marks the blocks it skipped
+as scanned.
+"""
 
-REGISTRY_ABI = json.loads('''[{"constant":true,"inputs":[{"name":"node","type":"bytes32"}],"name":"resolver","outputs":[{"name":"","type":"address"}],"payable":false,"type":"function"},{"constant":true,"inputs":[{"name":"node","type":"bytes32"}],"name":"owner","outputs":[{"name":"","type":"address"}],"payable":false,"type":"function"},{"constant":false,"inputs":[{"name":"node","type":"bytes32"},{"name":"label","type":"bytes32"},{"name":"owner","type":"address"}],"name":"setSubnodeOwner","outputs":[],"payable":false,"type":"function"},{"constant":false,"inputs":[{"name":"node","type":"bytes32"},{"name":"ttl","type":"uint64"}],"name":"setTTL","outputs":[],"payable":false,"type":"function"},{"constant":true,"inputs":[{"name":"node","type":"bytes32"}],"name":"ttl","outputs":[{"name":"","type":"uint64"}],"payable":false,"type":"function"},{"constant":false,"inputs":[{"name":"node","type":"bytes32"},{"name":"resolver","type":"address"}],"name":"setResolver","outputs":[],"payable":false,"type":"function"},{"constant":false,"inputs":[{"name":"node","type":"bytes32"},{"name":"owner","type":"address"}],"name":"setOwner","outputs":[],"payable":false,"type":"function"},{"anonymous":false,"inputs":[{"indexed":true,"name":"node","type":"bytes32"},{"indexed":false,"name":"owner","type":"address"}],"name":"Transfer","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"node","type":"bytes32"},{"indexed":true,"name":"label","type":"bytes32"},{"indexed":false,"name":"owner","type":"address"}],"name":"NewOwner","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"node","type":"bytes32"},{"indexed":false,"name":"resolver","type":"address"}],"name":"NewResolver","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"node","type":"bytes32"},{"indexed":false,"name":"ttl","type":"uint64"}],"name":"NewTTL","type":"event"}]''')
+ZERO_HASH = HexBytes('0000000000000000000000000000000000000000000000000000000000000000')
 
-SUBDOMAIN_REGISTRAR_ABI = json.loads('''[{"constant":true,"inputs":[{"name":"interfaceID","type":"bytes4"}],"name":"supportsInterface","outputs":[{"name":"","type":"bool"}],"payable":false,"stateMutability":"pure","type":"function"},{"constant":true,"inputs":[{"name":"label","type":"bytes32"}],"name":"owner","outputs":[{"name":"","type":"address"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[],"name":"stop","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[],"name":"migration","outputs":[{"name":"","type":"address"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[],"name":"registrarOwner","outputs":[{"name":"","type":"address"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[],"name":"registrar","outputs":[{"name":"","type":"address"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[{"name":"label","type":"bytes32"},{"name":"subdomain","type":"string"}],"name":"query","outputs":[{"name":"domain","type":"string"},{"name":"price","type":"uint256"},{"name":"rent","type":"uint256"},{"name":"referralFeePPM","type":"uint256"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[],"name":"ens","outputs":[{"name":"","type":"address"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[{"name":"label","type":"bytes32"},{"name":"subdomain","type":"string"},{"name":"_subdomainOwner","type":"address"},{"name":"referrer","type":"address"},{"name":"resolver","type":"address"}],"name":"register","outputs":[],"payable":true,"stateMutability":"payable","type":"function"},{"constant":false,"inputs":[{"name":"_migration","type":"address"}],"name":"setMigrationAddress","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[{"name":"label","type":"bytes32"},{"name":"subdomain","type":"string"}],"name":"rentDue","outputs":[{"name":"timestamp","type":"uint256"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[{"name":"name","type":"string"},{"name":"resolver","type":"address"}],"name":"setResolver","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[],"name":"stopped","outputs":[{"name":"","type":"bool"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[],"name":"TLD_NODE","outputs":[{"name":"","type":"bytes32"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[{"name":"name","type":"string"}],"name":"migrate","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":false,"inputs":[{"name":"label","type":"bytes32"},{"name":"subdomain","type":"string"}],"name":"payRent","outputs":[],"payable":true,"stateMutability":"payable","type":"function"},{"constant":false,"inputs":[{"name":"name","type":"string"},{"name":"price","type":"uint256"},{"name":"referralFeePPM","type":"uint256"},{"name":"_owner","type":"address"},{"name":"_transfer","type":"address"}],"name":"configureDomainFor","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":false,"inputs":[{"name":"name","type":"string"},{"name":"price","type":"uint256"},{"name":"referralFeePPM","type":"uint256"}],"name":"configureDomain","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":false,"inputs":[{"name":"name","type":"string"}],"name":"unlistDomain","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":false,"inputs":[{"name":"newOwner","type":"address"}],"name":"transferOwnership","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":false,"inputs":[{"name":"name","type":"string"},{"name":"newOwner","type":"address"}],"name":"transfer","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"inputs":[{"name":"ens","type":"address"}],"payable":false,"stateMutability":"nonpayable","type":"constructor"},{"anonymous":false,"inputs":[{"indexed":true,"name":"label","type":"bytes32"},{"indexed":false,"name":"name","type":"string"}],"name":"DomainTransferred","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"label","type":"bytes32"},{"indexed":true,"name":"oldOwner","type":"address"},{"indexed":true,"name":"newOwner","type":"address"}],"name":"OwnerChanged","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"label","type":"bytes32"}],"name":"DomainConfigured","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"label","type":"bytes32"}],"name":"DomainUnlisted","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"label","type":"bytes32"},{"indexed":false,"name":"subdomain","type":"string"},{"indexed":true,"name":"owner","type":"address"},{"indexed":true,"name":"referrer","type":"address"},{"indexed":false,"name":"price","type":"uint256"}],"name":"NewRegistration","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"label","type":"bytes32"},{"indexed":false,"name":"subdomain","type":"string"},{"indexed":false,"name":"amount","type":"uint256"},{"indexed":false,"name":"expirationDate","type":"uint256"}],"name":"RentPaid","type":"event"}]''')
+# Topics of the events label hashes are read from
+BID_REVEALED = '0x' + event_signature_to_log_topic('BidRevealed(bytes32,address,uint256,uint8)').hex()
+NAME_REGISTERED = '0x' + event_signature_to_log_topic('NameRegistered(uint256,address,uint256)').hex()
+NAME_MIGRATED = '0x' + event_signature_to_log_topic('NameMigrated(uint256,address,uint256)').hex()
+NAME_RENEWED = '0x' + event_signature_to_log_topic('NameRenewed(uint256,uint256)').hex()
+NEW_REGISTRATION = '0x' + event_signature_to_log_topic('NewRegistration(bytes32,string,address,address,uint256)').hex()
 
 logger = logging.getLogger('main')
 logger.setLevel(logging.DEBUG)
-w3.middleware_onion.add(web3.middleware.http_retry_request_middleware)
+# Both migrate.py and get_names.py may be imported into the same process
+if web3.middleware.http_retry_request_middleware not in w3.middleware_onion:
+    w3.middleware_onion.add(web3.middleware.http_retry_request_middleware)
 
 parser = argparse.ArgumentParser(description="Extract a list of .eth label hashes from onchain events")
 parser.add_argument('--start', type=int, help="Start block", default=0)
 parser.add_argument('--subdomains', action='store_true', default=False, help="Get subdomain labels instead of .eth labels")
+parser.add_argument('--parallelism', type=int, default=8, help="Maximum number of concurrent log requests")
+parser.add_argument('--incremental', action='store_true', default=False, help="Only scan blocks after those recorded in the checkpoint file from a previous run")
+parser.add_argument('--blocks', type=int, default=5000, help="Number of blocks to request logs for at once")
+parser.add_argument('--memory', type=parse_size, default=DEFAULT_MEMORY, help="Approximate memory to use deduplicating labels before spilling to disk, e.g. 256M")
 parser.add_argument('registry', type=str, help="Registry address")
 parser.add_argument('file', type=argparse.FileType('r+t'))
 
-def get_logs_iter(event, argumentFilters=None, fromBlock=1, toBlock='latest', targetBatchSize=100, maxBlocks=1000, mixingFactor=0.05):
-    if toBlock == 'latest':
-        toBlock = w3.eth.blockNumber
-    numBlocks = maxBlocks / 2
-    while fromBlock < toBlock:
-        endBlock = min(fromBlock + int(numBlocks), toBlock)
-        logging.info("Fetching %d blocks of logs starting at %d for address %s…%s", numBlocks, fromBlock, event.address[:6], event.address[-4:])
-        logs = event.getLogs(argument_filters=argumentFilters, fromBlock=fromBlock, toBlock=endBlock-1)
-        for log in logs:
-            yield log
-        fromBlock = endBlock
-        logsPerBlock = max(len(logs) / numBlocks, 2 / maxBlocks)
-        numBlocks = min(maxBlocks, (1 - mixingFactor) * numBlocks + mixingFactor * targetBatchSize / logsPerBlock)
+def _is_too_many_results(e):
+    """Returns true if `e` is a node rejecting a log query for covering too many results."""
+    error = e.args[0] if e.args else None
+    if isinstance(error, dict):
+        if error.get('code') == -32005:
+            return True
+        error = error.get('message', '')
+    error = str(error).lower()
+    return any(message in error for message in ('more than', 'too many', 'limit exceeded', 'response size', 'too large'))
+
+
+def provider_uri():
+    """Returns the HTTP URI of the node `w3` is connected to, for fetching from it directly."""
+    return getattr(w3.provider, 'endpoint_uri', None) or os.environ.get('WEB3_PROVIDER_URI', 'http://localhost:8545')
+
+
+def combine_scans(scans):
+    """Combines (address, topic, fromBlock, toBlock) scans into as few log filters as possible.
+
+    Returns a list of (addresses, topics, wanted, fromBlock, toBlock) tuples,
+    one for each run of blocks over which the same scans are active. A filter on
+    several addresses and topics matches every combination of them, so `wanted`
+    is the set of (address, topic) pairs to keep from its results.
+    """
+    bounds = sorted(set(block for _, _, fromBlock, toBlock in scans for block in (fromBlock, toBlock)))
+    combined = []
+    for fromBlock, toBlock in zip(bounds, bounds[1:]):
+        wanted = frozenset((address.lower(), topic) for address, topic, start, end in scans if start <= fromBlock and toBlock <= end)
+        if not wanted:
+            continue
+        if combined and combined[-1][2] == wanted and combined[-1][4] == fromBlock:
+            combined[-1] = combined[-1][:4] + (toBlock,)
+            continue
+        combined.append((sorted(set(address for address, _ in wanted)), sorted(set(topic for _, topic in wanted)), wanted, fromBlock, toBlock))
+    return combined
+
+
+async def _fetch_raw_logs(rpc, query):
+    """Fetches the raw logs for an (addresses, topics, wanted, fromBlock, toBlock) query, bisecting the range if the node rejects it as too large."""
+    addresses, topics, wanted, fromBlock, toBlock = query
+    logging.info("Fetching %d blocks of logs starting at %d for %d addresses", toBlock - fromBlock, fromBlock, len(addresses))
+    try:
+        logs = await rpc.request('eth_getLogs', [{'address': addresses, 'topics': [topics], 'fromBlock': hex(fromBlock), 'toBlock': hex(toBlock - 1)}])
+    except RPCError as e:
+        if toBlock - fromBlock <= 1 or not _is_too_many_results(e):
+            raise
+        midBlock = (fromBlock + toBlock) // 2
+        logging.info("Too many results for blocks %d-%d; splitting at %d", fromBlock, toBlock, midBlock)
+        return (await _fetch_raw_logs(rpc, (addresses, topics, wanted, fromBlock, midBlock)) +
+                await _fetch_raw_logs(rpc, (addresses, topics, wanted, midBlock, toBlock)))
+    return [log for log in logs if (log['address'].lower(), log['topics'][0]) in wanted]
+
+
+def scan_raw_logs(fetcher, scans, blocks=5000):
+    """Yields the undecoded logs for each (address, topic, fromBlock, toBlock) in `scans`.
+
+    Scans active over the same blocks are fetched together, with a single
+    `eth_getLogs` filter on all their addresses and topics, in ranges of
+    `blocks` blocks; `fetcher` bounds the number of requests in flight. Logs are
+    yielded as the node returns them, in order of block range, with hex string
+    fields; read them with `raw_label` and `raw_word`.
+    """
+    def queries():
+        for addresses, topics, wanted, fromBlock, toBlock in combine_scans(scans):
+            for startBlock in range(fromBlock, toBlock, blocks):
+                yield (addresses, topics, wanted, startBlock, min(startBlock + blocks, toBlock))
+    for logs in fetcher.imap(_fetch_raw_logs, queries()):
+        yield from logs
+
+
+def raw_label(log):
+    """Returns the label hash indexed as the first argument of a raw registrar log, as hex without a 0x prefix."""
+    return log['topics'][1][2:].lower()
+
+
+def raw_word(log, index):
+    """Returns the `index`th 32 byte word of a raw log's data as an integer."""
+    return int(log['data'][2 + index * 64:2 + (index + 1) * 64], 16)
 
 
 def get_registrars(ens):
@@ -65,13 +155,13 @@ def get_registrars(ens):
     for log in ens.events.NewOwner.getLogs(argument_filters={'node': ZERO_HASH, 'label': label_to_hash('eth')}, fromBlock=0, toBlock='latest'):
         if lastRegistrar is not None:
             yield (lastRegistrar, startBlock, int(log.blockNumber))
-        auctionRegistrar = w3.eth.contract(abi=AUCTION_REGISTRAR_ABI, address=log.args.owner)
+        auctionRegistrar = w3.eth.contract(abi=abis.AUCTION_REGISTRAR_ABI, address=log.args.owner)
         try:
             auctionRegistrar.functions.entries(ZERO_HASH).call()
             lastRegistrar = auctionRegistrar
             logging.info("Auction registrar %s at block %d", log.args.owner, log.blockNumber)
         except (web3.exceptions.BadFunctionCallOutput, ValueError) as e:
-            permanentRegistrar = w3.eth.contract(abi=BASE_REGISTRAR_ABI, address=log.args.owner)
+            permanentRegistrar = w3.eth.contract(abi=abis.BASE_REGISTRAR_ABI, address=log.args.owner)
             try:
                 permanentRegistrar.functions.nameExpires(0).call()
                 lastRegistrar = permanentRegistrar
@@ -84,61 +174,123 @@ def get_registrars(ens):
         yield (lastRegistrar, startBlock, 'latest')
 
 
-def get_auction_registrar_names(event, startBlock, endBlock):
-    logging.info("Getting auction registrar names at %s from %d to %d", event.address, startBlock, endBlock)
-    for log in get_logs_iter(event, fromBlock=startBlock, toBlock=endBlock):
-        if log.args.status != 2: continue
-        yield (log.args.hash.hex(),)
+def checkpoint_key(event):
+    return "%s:%s" % (event.address, event.event_name)
+
+
+def load_checkpoint(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
 
 
-def get_permanent_registrar_names(event, startBlock, endBlock):
-    logging.info("Getting permanent registrar names at %s from %d to %s", event.address, startBlock, endBlock)
-    for log in get_logs_iter(event, fromBlock=startBlock, toBlock=endBlock):
-        yield (log.args.id.to_bytes(32, byteorder='big').hex(),)
+def save_checkpoint(path, checkpoint):
+    with open(path + '.tmp', 'w') as f:
+        json.dump(checkpoint, f, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
 
 
-def uniq(it):
-    seen = set()
-    for item in it:
-        if item not in seen:
-            yield item
-            seen.add(item)
+def append_new_rows(f, rows, memory=DEFAULT_MEMORY):
+    """Appends each row in `rows` that is not already present in the CSV file `f`, returning the number written.
 
+    The new rows and the rows of `f` are each sorted and deduplicated within
+    about half of `memory` bytes, spilling to disk as needed, then merged to find
+    the new rows `f` lacks. New rows are appended in sorted order.
+    """
+    new = sort_unique(rows, memory // 2)
+    f.seek(0)
+    existing = sort_unique(csv.reader(f), memory // 2)
+    f.seek(0, os.SEEK_END)
+    w = csv.writer(f)
+    count = 0
+    for row in difference(new, existing):
+        w.writerow(row)
+        count += 1
+    f.flush()
+    os.fsync(f.fileno())
+    return count
 
-def get_domains(start, registry):
-    ens = w3.eth.contract(abi=REGISTRY_ABI, address=registry)
-    filters = []
-    for registrar, startBlock, endBlock in get_registrars(ens):
-        startBlock = max(startBlock, start)
-        if endBlock != 'latest' and startBlock > endBlock: continue
+
+def advance_checkpoint(checkpoint, key, firstBlock, startBlock, endBlock):
+    """Records that `startBlock` to `endBlock` was scanned, if that leaves no gap after `firstBlock` or the existing checkpoint."""
+    if startBlock <= max(firstBlock, checkpoint.get(key, 0)):
+        checkpoint[key] = max(endBlock, checkpoint.get(key, 0))
+
+
+def get_domains(start, registry, blocks=5000, parallelism=8, checkpoint=None, resume=False):
+    """Yields .eth label rows, updating `checkpoint` with the blocks scanned for each registrar once done.
+
+    With `resume`, each registrar is scanned from its checkpoint if that is later than `start`.
+    """
+    ens = w3.eth.contract(abi=abis.REGISTRY_ABI, address=registry)
+    latest = w3.eth.blockNumber
+    scans = []
+    for registrar, firstBlock, endBlock in get_registrars(ens):
+        if endBlock == 'latest':
+            endBlock = latest
+        startBlock = max(firstBlock, start)
+        if startBlock > endBlock: continue
         try:
-            filters.append(get_auction_registrar_names(registrar.events.BidRevealed, startBlock, endBlock))
+            event = registrar.events.BidRevealed
+            kind = 'auction'
+            topic = BID_REVEALED
         except web3.exceptions.MismatchedABI:
             try:
-                filters.append(get_permanent_registrar_names(registrar.events.NameRegistered, startBlock, endBlock))
+                event = registrar.events.NameRegistered
+                kind = 'permanent'
+                topic = NAME_REGISTERED
             except web3.exceptions.MismatchedABI:
                 logging.error("Unrecognised registrar at address %s and block %d", registrar.address, startBlock)
-    return itertools.chain(*filters)
+                continue
+        if resume and checkpoint is not None:
+            startBlock = max(startBlock, checkpoint.get(checkpoint_key(event), 0))
+        logging.info("Getting %s registrar names at %s from %d to %d", kind, registrar.address, startBlock, endBlock)
+        scans.append((event, topic, firstBlock, startBlock, endBlock))
+
+    fetcher = Fetcher(provider_uri(), parallelism)
+    for log in scan_raw_logs(fetcher, [(event.address, topic, startBlock, endBlock) for event, topic, _, startBlock, endBlock in scans], blocks):
+        # Only bids revealed with status 2 won their auction
+        if log['topics'][0] == BID_REVEALED and raw_word(log, 1) != 2:
+            continue
+        yield (raw_label(log),)
+
+    if checkpoint is not None:
+        for event, _, firstBlock, startBlock, endBlock in scans:
+            advance_checkpoint(checkpoint, checkpoint_key(event), firstBlock, startBlock, endBlock)
+
 
+def get_subdomains(start, registrarAddress, blocks=5000, parallelism=8, checkpoint=None, resume=False):
+    """Yields subdomain label rows, updating `checkpoint` with the blocks scanned once done.
 
-def get_subdomains(start, registrarAddress):
-    registrar = w3.eth.contract(abi=SUBDOMAIN_REGISTRAR_ABI, address=registrarAddress)
-    for log in get_logs_iter(registrar.events.NewRegistration, fromBlock=start, toBlock='latest'):
-        yield (log.args.label.hex(), log.args.subdomain)
+    With `resume`, the scan starts from the checkpoint if that is later than `start`.
+    """
+    registrar = w3.eth.contract(abi=abis.SUBDOMAIN_REGISTRAR_ABI, address=registrarAddress)
+    event = registrar.events.NewRegistration
+    latest = w3.eth.blockNumber
+    if resume and checkpoint is not None:
+        start = max(start, checkpoint.get(checkpoint_key(event), 0))
+    fetcher = Fetcher(provider_uri(), parallelism)
+    for log in scan_raw_logs(fetcher, [(registrarAddress, NEW_REGISTRATION, start, latest)], blocks):
+        # The data holds the non-indexed subdomain name and price
+        subdomain, _ = decode_abi(['string', 'uint256'], HexBytes(log['data']))
+        yield (raw_label(log), subdomain)
+    if checkpoint is not None:
+        # The registrar's deployment block isn't known, so only a scan from the genesis block starts a checkpoint
+        advance_checkpoint(checkpoint, checkpoint_key(event), 0, start, latest)
 
 
 def main(args):
-    r = csv.reader(args.file)
-    labels = set((tuple(row) for row in r))
+    checkpointPath = args.file.name + '.checkpoint'
+    checkpoint = load_checkpoint(checkpointPath)
     if args.subdomains:
-        new_labels = get_subdomains(args.start, args.registry)
+        new_labels = get_subdomains(args.start, args.registry, args.blocks, args.parallelism, checkpoint, args.incremental)
     else:
-        new_labels = get_domains(args.start, args.registry)
-    labels = uniq(itertools.chain(labels, new_labels))
-    args.file.seek(0)
-    w = csv.writer(args.file)
-    for label in labels:
-        w.writerow(label)
+        new_labels = get_domains(args.start, args.registry, args.blocks, args.parallelism, checkpoint, args.incremental)
+    count = append_new_rows(args.file, new_labels, args.memory)
+    logging.info("Appended %d new labels to %s", count, args.file.name)
+    save_checkpoint(checkpointPath, checkpoint)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,149 @@
+from hexbytes import HexBytes
+import sqlite3
+import time
+
+"""
+A durable record of the progress of a migration run.
+
+The journal tracks every batch of labels migrate.py submits: the labels it
+contained, the nonce and hash of the transaction that carried it, and whether
+that transaction has been confirmed. It also tracks a cursor into the label
+list; every label before the cursor has either been skipped or belongs to a
+journaled batch, so a restarted run can begin there and only needs to deal with
+batches the journal does not show as confirmed.
+
+Batch statuses are:
+ - 'pending': recorded, but no transaction is known to have been sent.
+ - 'submitted': signed as transaction `txhash`, which has not yet been mined.
+   It is journaled before being broadcast, so may never have reached the node.
+ - 'confirmed': mined successfully.
+ - 'failed': mined, but reverted.
+ - 'dropped': another transaction was mined with the batch's nonce.
+ - 'superseded': any labels still needing migration were moved to new batches.
+"""
+
+UNCONFIRMED = ('pending', 'submitted', 'failed', 'dropped')
+
+
+class Journal:
+    def __init__(self, path):
+        self.db = sqlite3.connect(path)
+        self.db.executescript('''
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS batches (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                labels BLOB NOT NULL,
+                nonce INTEGER,
+                txhash BLOB,
+                status TEXT NOT NULL,
+                updated REAL NOT NULL);
+            CREATE INDEX IF NOT EXISTS batches_status ON batches (status, nonce);
+        ''')
+
+    def _get_meta(self, key):
+        row = self.db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self.db.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, str(value)))
+
+    def _check_meta(self, key, value, description):
+        existing = self._get_meta(key)
+        if existing is not None and existing != str(value):
+            raise ValueError("Journal belongs to %s %s, not %s" % (description, existing, value))
+        with self.db:
+            self._set_meta(key, value)
+
+    def check_source(self, source):
+        """Associates the journal with a label list, raising ValueError if it already belongs to a different one."""
+        self._check_meta('source', source, 'label list')
+
+    def check_sender(self, shard, account):
+        """Associates the journal with a shard of the label list and the account sending its transactions.
+
+        Raises ValueError if it already belongs to a different shard or account,
+        since its nonces and cursor would mean nothing for them.
+        """
+        self._check_meta('shard', shard, 'shard')
+        self._check_meta('account', account, 'account')
+
+    def get_cursor(self):
+        cursor = self._get_meta('cursor')
+        return int(cursor) if cursor is not None else None
+
+    def set_cursor(self, cursor):
+        with self.db:
+            self._set_meta('cursor', cursor)
+
+    def add_batch(self, kind, labels, cursor=None):
+        """Records a new pending batch, and optionally advances the cursor past it in the same transaction."""
+        with self.db:
+            batchId = self.db.execute(
+                'INSERT INTO batches (kind, labels, status, updated) VALUES (?, ?, ?, ?)',
+                (kind, b''.join(labels), 'pending', time.time())).lastrowid
+            if cursor is not None:
+                self._set_meta('cursor', cursor)
+        return batchId
+
+    def supersede(self, batchId, batches):
+        """Marks a batch superseded and records a new pending batch in its place for each (kind, labels) in `batches`.
+
+        Returns the IDs of the new batches.
+        """
+        with self.db:
+            self.db.execute('UPDATE batches SET status = ?, updated = ? WHERE id = ?', ('superseded', time.time(), batchId))
+            return [
+                self.db.execute(
+                    'INSERT INTO batches (kind, labels, status, updated) VALUES (?, ?, ?, ?)',
+                    (kind, b''.join(labels), 'pending', time.time())).lastrowid
+                for kind, labels in batches]
+
+    def submitted(self, batchId, nonce, txhash):
+        with self.db:
+            self.db.execute(
+                'UPDATE batches SET nonce = ?, txhash = ?, status = ?, updated = ? WHERE id = ?',
+                (nonce, bytes(txhash), 'submitted', time.time(), batchId))
+
+    def replaced(self, batchId, txhash):
+        """Records that a batch's transaction was resent, at the same nonce, as `txhash`."""
+        with self.db:
+            self.db.execute('UPDATE batches SET txhash = ?, updated = ? WHERE id = ?', (bytes(txhash), time.time(), batchId))
+
+    def set_status(self, batchId, status):
+        with self.db:
+            self.db.execute('UPDATE batches SET status = ?, updated = ? WHERE id = ?', (status, time.time(), batchId))
+
+    def submitted_below(self, nonce):
+        """Returns (id, txhash) for each submitted batch with a nonce below `nonce`, and so already mined or replaced."""
+        rows = self.db.execute(
+            'SELECT id, txhash FROM batches WHERE status = ? AND nonce < ? ORDER BY nonce', ('submitted', nonce))
+        return [(batchId, HexBytes(txhash)) for batchId, txhash in rows]
+
+    def submitted_from(self, nonce):
+        """Returns (id, txhash) for each submitted batch with a nonce of at least `nonce`, and so not yet mined."""
+        rows = self.db.execute(
+            'SELECT id, txhash FROM batches WHERE status = ? AND nonce >= ? ORDER BY nonce', ('submitted', nonce))
+        return [(batchId, HexBytes(txhash)) for batchId, txhash in rows]
+
+    def unconfirmed(self):
+        """Returns (id, kind, labels, nonce, txhash, status) for each batch not yet confirmed or superseded, oldest first."""
+        rows = self.db.execute(
+            'SELECT id, kind, labels, nonce, txhash, status FROM batches WHERE status IN (%s) ORDER BY id' % (','.join('?' * len(UNCONFIRMED)),),
+            UNCONFIRMED)
+        return [(batchId, kind, _split_labels(labels), nonce, HexBytes(txhash) if txhash is not None else None, status)
+                for batchId, kind, labels, nonce, txhash, status in rows]
+
+    def counts(self):
+        """Returns a dict mapping each batch status to a (batches, labels) count."""
+        rows = self.db.execute('SELECT status, COUNT(*), SUM(LENGTH(labels)) / 32 FROM batches GROUP BY status')
+        return {status: (batches, labels) for status, batches, labels in rows}
+
+    def close(self):
+        self.db.close()
+
+
+def _split_labels(data):
+    return [HexBytes(data[i:i + 32]) for i in range(0, len(data), 32)]
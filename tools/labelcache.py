@@ -0,0 +1,43 @@
+import sqlite3
+
+"""
+An on-disk cache of label states observed by migrate.py, keyed by label hash.
+
+Each entry records the category a label was last seen in ('migrated',
+'permanent', 'legacy' or 'unregistered'), its expiry on the old registrar if it
+had one, and the block number it was observed at.
+"""
+
+
+class LabelCache:
+    def __init__(self, path):
+        # Entries are written from the fetcher's event loop thread
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('''CREATE TABLE IF NOT EXISTS labels (
+            hash BLOB PRIMARY KEY,
+            category TEXT NOT NULL,
+            expires INTEGER,
+            block INTEGER NOT NULL)''')
+        self.pending = 0
+
+    def get(self, label):
+        """Returns a (category, expires, block) tuple for `label`, or None if it has not been seen."""
+        return self.db.execute('SELECT category, expires, block FROM labels WHERE hash = ?', (bytes(label),)).fetchone()
+
+    def put(self, label, category, expires, block):
+        self.db.execute(
+            'INSERT OR REPLACE INTO labels (hash, category, expires, block) VALUES (?, ?, ?, ?)',
+            (bytes(label), category, expires, block))
+        self.pending += 1
+        if self.pending >= 1000:
+            self.commit()
+
+    def commit(self):
+        self.db.commit()
+        self.pending = 0
+
+    def close(self):
+        self.commit()
+        self.db.close()
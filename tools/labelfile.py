@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+import argparse
+import csv
+from hexbytes import HexBytes
+import logging
+import mmap
+
+"""
+Converts label hash lists between the hex text format written by get_names.py
+and a packed binary format that migrate.py can memory-map.
+
+Usage:
+
+  python3 labelfile.py pack ropsten.txt ropsten.bin
+  python3 labelfile.py unpack ropsten.bin ropsten.txt
+
+A packed file is a sequence of fixed 32-byte records. The first record is a
+header starting with `MAGIC`; each subsequent record is one label hash, so
+label `i` is found at byte offset `(i + 1) * 32`. Only the first column of each
+input row is packed, so subdomain lists lose their subdomain names.
+"""
+
+logger = logging.getLogger('labelfile')
+
+RECORD_SIZE = 32
+MAGIC = b'ENSLABELS\x00\x01'
+HEADER = MAGIC.ljust(RECORD_SIZE, b'\x00')
+
+
+def is_label_file(f):
+    """Returns true if the binary file object `f` is a packed label file, without changing its position."""
+    pos = f.tell()
+    header = f.read(len(MAGIC))
+    f.seek(pos)
+    return header == MAGIC
+
+
+class LabelFile:
+    """A memory-mapped, read-only packed label file."""
+    def __init__(self, f):
+        self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mm[:len(MAGIC)] != MAGIC:
+            raise ValueError("%s is not a packed label file" % (f.name,))
+        if len(self.mm) % RECORD_SIZE != 0:
+            raise ValueError("%s is truncated" % (f.name,))
+
+    def __len__(self):
+        return len(self.mm) // RECORD_SIZE - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        offset = (i + 1) * RECORD_SIZE
+        return HexBytes(self.mm[offset:offset + RECORD_SIZE])
+
+    def iter_from(self, start=0):
+        count = len(self)
+        for i in range(start, count):
+            if i % 100000 == 0:
+                logger.info("Read %d labels (%.1f%%)", i, (i / count) * 100)
+            offset = (i + 1) * RECORD_SIZE
+            yield HexBytes(self.mm[offset:offset + RECORD_SIZE])
+
+    def __iter__(self):
+        return self.iter_from(0)
+
+    def close(self):
+        self.mm.close()
+
+
+def pack(infile, outfile):
+    outfile.write(HEADER)
+    count = 0
+    for row in csv.reader(infile):
+        if not row: continue
+        label = HexBytes(row[0].strip())
+        if len(label) != RECORD_SIZE:
+            raise ValueError("Invalid label hash on line %d: %s" % (count + 1, row[0]))
+        outfile.write(label)
+        count += 1
+    return count
+
+
+def unpack(infile, outfile):
+    labels = LabelFile(infile)
+    for label in labels:
+        outfile.write(bytes(label).hex() + '\n')
+    count = len(labels)
+    labels.close()
+    return count
+
+
+parser = argparse.ArgumentParser(description="Convert label hash lists to and from the packed binary format")
+subparsers = parser.add_subparsers()
+
+pack_parser = subparsers.add_parser('pack', help='Convert a text label list to a packed file')
+pack_parser.add_argument('infile', type=argparse.FileType('rt'))
+pack_parser.add_argument('outfile', type=argparse.FileType('wb'))
+pack_parser.set_defaults(func=pack)
+
+unpack_parser = subparsers.add_parser('unpack', help='Convert a packed file to a text label list')
+unpack_parser.add_argument('infile', type=argparse.FileType('rb'))
+unpack_parser.add_argument('outfile', type=argparse.FileType('wt'))
+unpack_parser.set_defaults(func=unpack)
+
+
+def main(args):
+    count = args.func(args.infile, args.outfile)
+    logging.info("Converted %d labels", count)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main(parser.parse_args())
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+import argparse
+import csv
+import heapq
+import logging
+import tempfile
+
+"""
+Sorts, deduplicates and merges label lists in bounded memory.
+
+Usage:
+
+  python3 labelmerge.py --memory 256M merged.txt ropsten.txt goerli.txt mainnet.txt
+
+Rows (a label hash, or a label hash and subdomain name) are read into memory
+until they take up about `--memory` bytes, then sorted, deduplicated and
+spilled to a temporary file as a sorted run. The runs are combined with a k-way
+merge, dropping duplicates, so memory use is bounded regardless of the size of
+the inputs. If there are more than `MAX_RUNS` runs, they are first merged into
+larger ones in passes.
+
+get_names.py uses the same machinery to append only the rows that are not
+already in its output file.
+"""
+
+logger = logging.getLogger('labelmerge')
+
+DEFAULT_MEMORY = 256 * 1024 * 1024
+# Maximum number of runs to merge at once, to bound the number of open files
+MAX_RUNS = 64
+# Approximate memory used by each row and string besides the characters themselves
+ROW_OVERHEAD = 120
+FIELD_OVERHEAD = 50
+
+
+def parse_size(s):
+    """Parses a size in bytes, with an optional K, M or G suffix."""
+    multipliers = {'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3}
+    if s[-1].lower() in multipliers:
+        return int(float(s[:-1]) * multipliers[s[-1].lower()])
+    return int(s)
+
+
+def _unique(rows):
+    """Yields the rows of a sorted iterable, skipping consecutive duplicates."""
+    last = None
+    for row in rows:
+        if row != last:
+            yield row
+            last = row
+
+
+def _spill(rows):
+    run = tempfile.TemporaryFile('w+t', newline='')
+    csv.writer(run).writerows(_unique(sorted(rows)))
+    run.seek(0)
+    return run
+
+
+def _read_run(run):
+    try:
+        for row in csv.reader(run):
+            yield tuple(row)
+    finally:
+        run.close()
+
+
+def _merge_runs(runs):
+    """Returns an iterator of the unique rows in a list of sorted run files, in order."""
+    while len(runs) > MAX_RUNS:
+        logger.info("Merging %d of %d sorted runs", MAX_RUNS, len(runs))
+        merged = tempfile.TemporaryFile('w+t', newline='')
+        csv.writer(merged).writerows(_unique(heapq.merge(*[_read_run(run) for run in runs[:MAX_RUNS]])))
+        merged.seek(0)
+        runs = runs[MAX_RUNS:] + [merged]
+    return _unique(heapq.merge(*[_read_run(run) for run in runs]))
+
+
+def sort_unique(rows, memory=DEFAULT_MEMORY):
+    """Returns an iterator over the unique rows in `rows`, in sorted order, using about `memory` bytes.
+
+    Rows may be lists or tuples, and are returned as tuples, so rows read back
+    from a CSV file compare equal to those generated in memory.
+    """
+    runs = []
+    buffer = []
+    size = 0
+    for row in rows:
+        if not row: continue
+        buffer.append(tuple(row))
+        size += ROW_OVERHEAD + sum(FIELD_OVERHEAD + len(field) for field in row)
+        if size >= memory:
+            runs.append(_spill(buffer))
+            logger.info("Spilled sorted run %d of %d rows", len(runs), len(buffer))
+            buffer = []
+            size = 0
+    if not runs:
+        # Everything fit in memory
+        return iter(list(_unique(sorted(buffer))))
+    if buffer:
+        runs.append(_spill(buffer))
+    return _merge_runs(runs)
+
+
+def difference(rows, exclude):
+    """Yields the rows of sorted iterable `rows` that are not in sorted iterable `exclude`; both should come from `sort_unique`."""
+    exclude = iter(exclude)
+    current = next(exclude, None)
+    for row in rows:
+        while current is not None and current < row:
+            current = next(exclude, None)
+        if row != current:
+            yield row
+
+
+def merge_files(files, memory=DEFAULT_MEMORY):
+    """Returns an iterator over the unique rows of all the CSV files in `files`, in sorted order."""
+    def rows():
+        for f in files:
+            logger.info("Reading %s", f.name)
+            yield from csv.reader(f)
+    return sort_unique(rows(), memory)
+
+
+parser = argparse.ArgumentParser(description="Sort, deduplicate and merge label lists")
+parser.add_argument('--memory', type=parse_size, default=DEFAULT_MEMORY, help="Approximate memory to use before spilling rows to disk, e.g. 256M")
+parser.add_argument('outfile', type=argparse.FileType('wt'))
+parser.add_argument('infiles', type=argparse.FileType('rt'), nargs='+')
+
+
+def main(args):
+    w = csv.writer(args.outfile, lineterminator='\n')
+    count = 0
+    for row in merge_files(args.infiles, args.memory):
+        w.writerow(row)
+        count += 1
+    args.outfile.close()
+    logging.info("Wrote %d unique labels to %s", count, args.outfile.name)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main(parser.parse_args())
@@ -0,0 +1,289 @@
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+import os
+import threading
+import time
+
+"""
+Counters, gauges and latency histograms for a long-running migrate.py process.
+
+`Metrics` records per-method RPC counts, latencies and errors, both for the
+web3 provider (see `instrument_provider`) and for `rpc.AsyncRPC`, along with
+whatever pipeline counters the caller increments. It can be read as a JSON
+snapshot or in the Prometheus text exposition format; `serve` publishes the
+latter over HTTP, and `Reporter` periodically logs a progress line with an ETA
+and writes a snapshot to a file.
+"""
+
+logger = logging.getLogger('metrics')
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Returns the upper bound of the bucket containing quantile `q`, or None if nothing has been observed."""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+        }
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    labels = list(key) + list(extra)
+    if not labels:
+        return ''
+    return '{%s}' % (','.join('%s="%s"' % (name, value) for name, value in labels),)
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.counters = defaultdict(int)
+        self.gauges = {}
+        self.gaugeFuncs = {}
+        self.histograms = {}
+        # Number of labels this run expects to process, for the ETA
+        self.total = None
+
+    def inc(self, name, value=1, **labels):
+        with self.lock:
+            self.counters[(name, _label_key(labels))] += value
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.gauges[(name, _label_key(labels))] = value
+
+    def gauge(self, name, func, **labels):
+        """Registers a gauge whose value is read by calling `func` whenever metrics are collected."""
+        with self.lock:
+            self.gaugeFuncs[(name, _label_key(labels))] = func
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def rpc(self, method, seconds, error=None):
+        """Records one RPC request. `error` is None, or a short description of how it failed."""
+        self.inc('rpc_requests_total', method=method)
+        self.observe('rpc_latency_seconds', seconds, method=method)
+        if error is not None:
+            self.inc('rpc_errors_total', method=method, error=error)
+
+    def count(self, name):
+        """Returns the sum of counter `name` across all its labels."""
+        with self.lock:
+            return sum(value for (counterName, _), value in self.counters.items() if counterName == name)
+
+    def _gauge_values(self):
+        with self.lock:
+            gauges = dict(self.gauges)
+            funcs = dict(self.gaugeFuncs)
+        for key, func in funcs.items():
+            try:
+                gauges[key] = func()
+            except Exception:
+                logger.exception("Error reading gauge %s", key[0])
+        return gauges
+
+    def progress(self):
+        """Returns (done, total, rate, eta) for the labels processed so far; total and eta may be None."""
+        done = self.count('labels_total')
+        elapsed = time.time() - self.started
+        rate = done / elapsed if elapsed > 0 else 0
+        eta = None
+        if self.total is not None and rate > 0:
+            eta = timedelta(seconds=int(max(0, self.total - done) / rate))
+        return (done, self.total, rate, eta)
+
+    def snapshot(self):
+        gauges = self._gauge_values()
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {key: histogram.snapshot() for key, histogram in self.histograms.items()}
+        done, total, rate, eta = self.progress()
+
+        def group(items):
+            ret = defaultdict(list)
+            for (name, labels), value in sorted(items.items()):
+                ret[name].append({'labels': dict(labels), 'value': value})
+            return ret
+        return {
+            'time': time.time(),
+            'elapsed': time.time() - self.started,
+            'progress': {'done': done, 'total': total, 'rate': rate, 'eta': eta.total_seconds() if eta is not None else None},
+            'counters': group(counters),
+            'gauges': group(gauges),
+            'histograms': group(histograms),
+        }
+
+    def prometheus(self):
+        """Returns the metrics in the Prometheus text exposition format."""
+        gauges = self._gauge_values()
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {key: (list(h.counts), h.sum, h.count, h.buckets) for key, h in self.histograms.items()}
+        done, total, rate, eta = self.progress()
+        gauges[('labels_per_second', ())] = rate
+        if total is not None:
+            gauges[('labels_expected', ())] = total
+        if eta is not None:
+            gauges[('eta_seconds', ())] = eta.total_seconds()
+
+        lines = []
+        typed = set()
+        def declare(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append('# TYPE migrate_%s %s' % (name, kind))
+        for (name, labels), value in sorted(counters.items()):
+            declare(name, 'counter')
+            lines.append('migrate_%s%s %s' % (name, _format_labels(labels), value))
+        for (name, labels), value in sorted(gauges.items()):
+            declare(name, 'gauge')
+            lines.append('migrate_%s%s %s' % (name, _format_labels(labels), value))
+        for (name, labels), (counts, total, count, buckets) in sorted(histograms.items()):
+            declare(name, 'histogram')
+            cumulative = 0
+            for bound, bucketCount in zip(list(buckets) + ['+Inf'], counts):
+                cumulative += bucketCount
+                lines.append('migrate_%s_bucket%s %d' % (name, _format_labels(labels, [('le', bound)]), cumulative))
+            lines.append('migrate_%s_sum%s %s' % (name, _format_labels(labels), total))
+            lines.append('migrate_%s_count%s %d' % (name, _format_labels(labels), count))
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        """Returns a one-line description of progress, RPC latency and sender state, for logging."""
+        done, total, rate, eta = self.progress()
+        parts = []
+        if total is not None:
+            parts.append("Processed %d/%d labels (%.1f/s, ETA %s)" % (done, total, rate, eta if eta is not None else 'unknown'))
+        else:
+            parts.append("Processed %d labels (%.1f/s)" % (done, rate))
+        with self.lock:
+            latency = Histogram()
+            for (name, _), histogram in self.histograms.items():
+                if name == 'rpc_latency_seconds':
+                    latency.count += histogram.count
+                    latency.counts = [a + b for a, b in zip(latency.counts, histogram.counts)]
+        if latency.count:
+            parts.append("RPC p50 %.3fs p95 %.3fs over %d requests, %d errors" % (
+                latency.quantile(0.5), latency.quantile(0.95), latency.count, self.count('rpc_errors_total')))
+        gauges = self._gauge_values()
+        pending = gauges.get(('pending_transactions', ()))
+        if pending is not None:
+            parts.append("%d transactions pending" % (pending,))
+        return '; '.join(parts)
+
+
+def instrument_provider(provider, metrics):
+    """Wraps `provider` so every request it makes, including each retry, is recorded in `metrics`."""
+    make_request = provider.make_request
+    def timed_request(method, params):
+        started = time.time()
+        try:
+            response = make_request(method, params)
+        except Exception as e:
+            metrics.rpc(method, time.time() - started, type(e).__name__)
+            raise
+        metrics.rpc(method, time.time() - started, 'response' if 'error' in response else None)
+        return response
+    provider.make_request = timed_request
+    return provider
+
+
+def serve(metrics, port, host=''):
+    """Serves `metrics` in the Prometheus text format on `port` from a background thread, returning the server."""
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.startswith('/metrics.json'):
+                body = json.dumps(metrics.snapshot()).encode('utf-8')
+                contentType = 'application/json'
+            else:
+                body = metrics.prometheus().encode('utf-8')
+                contentType = 'text/plain; version=0.0.4'
+            self.send_response(200)
+            self.send_header('Content-Type', contentType)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info("Serving metrics on port %d", server.server_address[1])
+    return server
+
+
+class Reporter:
+    """Logs a summary of `metrics` every `interval` seconds, and writes a JSON snapshot to `path` if given."""
+    def __init__(self, metrics, interval=60, path=None):
+        self.metrics = metrics
+        self.interval = interval
+        self.path = path
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        self.report()
+
+    def report(self):
+        logger.info(self.metrics.summary())
+        if self.path is not None:
+            with open(self.path + '.tmp', 'w') as f:
+                json.dump(self.metrics.snapshot(), f, indent=2)
+            os.replace(self.path + '.tmp', self.path)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.report()
+            except Exception:
+                logger.exception("Error reporting metrics")
@@ -1,20 +1,33 @@
 #!/usr/bin/env python3
 import argparse
+import abis
 from binascii import unhexlify
+import codec
+import collections
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from ens.utils import normal_name_to_hash
 from eth_account import Account
 from eth_utils import remove_0x_prefix
+from get_names import BID_REVEALED, NAME_MIGRATED, NAME_REGISTERED, NAME_RENEWED, raw_label, raw_word, scan_raw_logs
 from hexbytes import HexBytes
+import io
 import itertools
 import json
 import logging
-import multiprocessing.pool
 import os
+from journal import Journal
+from gasmodel import BatchPacker
+from labelcache import LabelCache
+from labelfile import LabelFile, is_label_file
+from metrics import Metrics, Reporter, instrument_provider, serve as serve_metrics
+from rpc import Fetcher
+from sender import TransactionSender
 import sys
 import time
 import web3
+from web3._utils.transactions import fill_transaction_defaults
 from web3.auto import w3
 
 # from web3.middleware import geth_poa_middleware
@@ -32,112 +45,341 @@ contract, which this script will query to fetch the addresses of all the
 relevant contracts.
 
 `label list` is the filename of a file containing a list of .eth 2LD label hashes
-to migrate. Hashes that are no longer registered will be ignored.
+to migrate. Hashes that are no longer registered will be ignored. The list may
+be a hex text file as written by get_names.py, or a packed binary file produced
+by `labelfile.py pack`, which is memory-mapped and can be resumed or started at
+any record index (`--start`) without reading the preceding records.
 
 `operation` is either `migrate` to perform the migration, or `verify` to check
 the migration was performed correctly. `migrate` takes an optional `--dryrun`
 argument, which causes `estimateGas` to be called instead of sending transactions.
+A dry run estimates batches concurrently and reports the total gas for each
+registrar, along with the cost at `--gasprice` and a lower bound on how long the
+migration will take with a sender window of `--window` transactions and blocks
+every `--blocktime` seconds. `--plan` writes the report, including every batch
+that would be sent, to a JSON file.
 
 If `--dryrun` is not provided as an argument to `migrate`, `--privatekey` must be
 supplied, specifying a hex-encoded private key from which to send migration transactions.
 
-If running against ganache, specify `--parallelism=1` before the operation, as
-ganache is prone to race-conditions.
+`migrate` records its progress in a journal (`--journal`, by default
+`migration.journal`): each batch sent, its nonce, transaction hash and whether
+it has been confirmed, along with how far through the label list it has got.
+If a run is interrupted, running it again resumes where it left off, first
+resending any journaled batches that were never sent, reverted or were
+replaced. Batches that revert or are dropped during a run are resent at the end
+of it, up to `--retries` times; if any are still unconfirmed after that,
+`migrate` exits with an error. Delete the journal, or pass `--start`, to start
+over.
+
+Batches are sized to use `--gasfraction` of the block gas limit. The gas cost
+per name on each registrar is learned from `estimateGas` as batches are sent,
+starting from `--batchsize` names per batch; pass `--gasfraction=0` to always
+send batches of `--batchsize` names instead.
+
+Transactions are sent with a locally tracked nonce, keeping up to `--window`
+unconfirmed at once. If the transaction at the account's next nonce is not mined
+within `--replaceafter` seconds, it is resent at the same nonce with its gas
+price multiplied by `--gasbump`, up to `--maxgasprice` (by default four times
+`--gasprice`).
+
+Label lookups are made concurrently from a single process; `--parallelism`
+bounds the number of RPC requests in flight at once. If running against ganache,
+specify `--parallelism=1` before the operation, as ganache is prone to
+race-conditions. `benchmark.py` measures throughput at different settings of
+`--parallelism` and `--rpcbatch` against a mock node with configurable latency.
+The calldata for registrar reads and migration transactions is built directly
+by codec.py rather than through web3 contract functions, whose per-call
+overhead is significant at these rates.
+
+`--cache=FILE` keeps a record of the state each label was found in. Labels the
+cache shows as migrated are not queried again on later runs, and names on the
+permanent registrar skip the old registrar read until their recorded expiry.
+
+`verify --fromlogs` rebuilds the sets of names on the new registrar, on the old
+permanent registrar (with their expiries) and won at auction from registrar
+logs, scanned as get_names.py does, and checks the label list against them
+locally. Only labels whose old registrar expiry is within `--margin` of now, or
+which were won at auction and not migrated, are read from the registrars.
+
+`--rpcbatch=N` categorises labels N at a time, sending the registrar reads for
+each group as a single JSON-RPC batch request. If `--multicall` is also given
+the address of a deployed Multicall contract, each group is instead read with
+a single `aggregate` call, for nodes that do not support batch requests.
+
+`--shard=i/n` restricts an operation to the labels whose hash, as a number,
+is `i` modulo `n`, so a migration can be split between `n` workers on one or
+more machines, each sending from its own `--privatekey`. A shard keeps its own
+journal, named after `--journal` (`migration.0-of-4.journal` and so on), which
+records the shard and account it belongs to. Its `--cache` is named the same
+way (`labels.0-of-4.cache` for `--cache=labels.cache`), so workers on one
+machine never contend for the same SQLite database; shards never read each
+other's labels, so nothing is lost. The `status --shards=n` operation merges
+the shard journals into a report of each shard's progress, and with `--verify`
+counts the labels in each shard that are still unmigrated.
+
+Every `--metricsinterval` seconds a progress line is logged with the number of
+labels processed, an ETA, RPC latency percentiles and the number of pending
+transactions. `--metricsport=PORT` serves per-method RPC counts, latency
+histograms and errors, label counts by category, batches sent and transaction
+outcomes in the Prometheus text format on `/metrics` (and as JSON on
+`/metrics.json`); `--metricsfile=FILE` writes the same as a JSON snapshot at
+each report.
 """
 
 logger = logging.getLogger('main')
 logger.setLevel(logging.DEBUG)
-w3.middleware_onion.add(web3.middleware.http_retry_request_middleware)
+# Both migrate.py and get_names.py may be imported into the same process
+if web3.middleware.http_retry_request_middleware not in w3.middleware_onion:
+    w3.middleware_onion.add(web3.middleware.http_retry_request_middleware)
 
-AUCTION_REGISTRAR_ABI = json.loads('''[{"constant":false,"inputs":[{"name":"_hash","type":"bytes32"}],"name":"releaseDeed","outputs":[],"payable":false,"type":"function"},{"constant":true,"inputs":[{"name":"_hash","type":"bytes32"}],"name":"getAllowedTime","outputs":[{"name":"timestamp","type":"uint256"}],"payable":false,"type":"function"},{"constant":false,"inputs":[{"name":"unhashedName","type":"string"}],"name":"invalidateName","outputs":[],"payable":false,"type":"function"},{"constant":true,"inputs":[{"name":"hash","type":"bytes32"},{"name":"owner","type":"address"},{"name":"value","type":"uint256"},{"name":"salt","type":"bytes32"}],"name":"shaBid","outputs":[{"name":"sealedBid","type":"bytes32"}],"payable":false,"type":"function"},{"constant":false,"inputs":[{"name":"bidder","type":"address"},{"name":"seal","type":"bytes32"}],"name":"cancelBid","outputs":[],"payable":false,"type":"function"},{"constant":true,"inputs":[{"name":"_hash","type":"bytes32"}],"name":"entries","outputs":[{"name":"","type":"uint8"},{"name":"","type":"address"},{"name":"","type":"uint256"},{"name":"","type":"uint256"},{"name":"","type":"uint256"}],"payable":false,"type":"function"},{"constant":true,"inputs":[],"name":"ens","outputs":[{"name":"","type":"address"}],"payable":false,"type":"function"},{"constant":false,"inputs":[{"name":"_hash","type":"bytes32"},{"name":"_value","type":"uint256"},{"name":"_salt","type":"bytes32"}],"name":"unsealBid","outputs":[],"payable":false,"type":"function"},{"constant":false,"inputs":[{"name":"_hash","type":"bytes32"}],"name":"transferRegistrars","outputs":[],"payable":false,"type":"function"},{"constant":true,"inputs":[{"name":"","type":"address"},{"name":"","type":"bytes32"}],"name":"sealedBids","outputs":[{"name":"","type":"address"}],"payable":false,"type":"function"},{"constant":true,"inputs":[{"name":"_hash","type":"bytes32"}],"name":"state","outputs":[{"name":"","type":"uint8"}],"payable":false,"type":"function"},{"constant":false,"inputs":[{"name":"_hash","type":"bytes32"},{"name":"newOwner","type":"address"}],"name":"transfer","outputs":[],"payable":false,"type":"function"},{"constant":true,"inputs":[{"name":"_hash","type":"bytes32"},{"name":"_timestamp","type":"uint256"}],"name":"isAllowed","outputs":[{"name":"allowed","type":"bool"}],"payable":false,"type":"function"},{"constant":false,"inputs":[{"name":"_hash","type":"bytes32"}],"name":"finalizeAuction","outputs":[],"payable":false,"type":"function"},{"constant":true,"inputs":[],"name":"registryStarted","outputs":[{"name":"","type":"uint256"}],"payable":false,"type":"function"},{"constant":true,"inputs":[],"name":"launchLength","outputs":[{"name":"","type":"uint32"}],"payable":false,"type":"function"},{"constant":false,"inputs":[{"name":"sealedBid","type":"bytes32"}],"name":"newBid","outputs":[],"payable":true,"type":"function"},{"constant":false,"inputs":[{"name":"labels","type":"bytes32[]"}],"name":"eraseNode","outputs":[],"payable":false,"type":"function"},{"constant":false,"inputs":[{"name":"_hashes","type":"bytes32[]"}],"name":"startAuctions","outputs":[],"payable":false,"type":"function"},{"constant":false,"inputs":[{"name":"hash","type":"bytes32"},{"name":"deed","type":"address"},{"name":"registrationDate","type":"uint256"}],"name":"acceptRegistrarTransfer","outputs":[],"payable":false,"type":"function"},{"constant":false,"inputs":[{"name":"_hash","type":"bytes32"}],"name":"startAuction","outputs":[],"payable":false,"type":"function"},{"constant":true,"inputs":[],"name":"rootNode","outputs":[{"name":"","type":"bytes32"}],"payable":false,"type":"function"},{"constant":false,"inputs":[{"name":"hashes","type":"bytes32[]"},{"name":"sealedBid","type":"bytes32"}],"name":"startAuctionsAndBid","outputs":[],"payable":true,"type":"function"},{"inputs":[{"name":"_ens","type":"address"},{"name":"_rootNode","type":"bytes32"},{"name":"_startDate","type":"uint256"}],"payable":false,"type":"constructor"},{"anonymous":false,"inputs":[{"indexed":true,"name":"hash","type":"bytes32"},{"indexed":false,"name":"registrationDate","type":"uint256"}],"name":"AuctionStarted","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"hash","type":"bytes32"},{"indexed":true,"name":"bidder","type":"address"},{"indexed":false,"name":"deposit","type":"uint256"}],"name":"NewBid","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"hash","type":"bytes32"},{"indexed":true,"name":"owner","type":"address"},{"indexed":false,"name":"value","type":"uint256"},{"indexed":false,"name":"status","type":"uint8"}],"name":"BidRevealed","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"hash","type":"bytes32"},{"indexed":true,"name":"owner","type":"address"},{"indexed":false,"name":"value","type":"uint256"},{"indexed":false,"name":"registrationDate","type":"uint256"}],"name":"HashRegistered","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"hash","type":"bytes32"},{"indexed":false,"name":"value","type":"uint256"}],"name":"HashReleased","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"hash","type":"bytes32"},{"indexed":true,"name":"name","type":"string"},{"indexed":false,"name":"value","type":"uint256"},{"indexed":false,"name":"registrationDate","type":"uint256"}],"name":"HashInvalidated","type":"event"}]''')
+# Set by init_contracts if --multicall is supplied
+multicall = None
 
-BASE_REGISTRAR_ABI = json.loads('''[{"constant":true,"inputs":[{"name":"interfaceID","type":"bytes4"}],"name":"supportsInterface","outputs":[{"name":"","type":"bool"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[{"name":"tokenId","type":"uint256"}],"name":"getApproved","outputs":[{"name":"","type":"address"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[{"name":"to","type":"address"},{"name":"tokenId","type":"uint256"}],"name":"approve","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":false,"inputs":[{"name":"from","type":"address"},{"name":"to","type":"address"},{"name":"tokenId","type":"uint256"}],"name":"transferFrom","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":false,"inputs":[{"name":"id","type":"uint256"},{"name":"owner","type":"address"}],"name":"reclaim","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[],"name":"ens","outputs":[{"name":"","type":"address"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[{"name":"from","type":"address"},{"name":"to","type":"address"},{"name":"tokenId","type":"uint256"}],"name":"safeTransferFrom","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[],"name":"transferPeriodEnds","outputs":[{"name":"","type":"uint256"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[{"name":"resolver","type":"address"}],"name":"setResolver","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[{"name":"tokenId","type":"uint256"}],"name":"ownerOf","outputs":[{"name":"","type":"address"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[],"name":"MIGRATION_LOCK_PERIOD","outputs":[{"name":"","type":"uint256"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[{"name":"owner","type":"address"}],"name":"balanceOf","outputs":[{"name":"","type":"uint256"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[],"name":"renounceOwnership","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[],"name":"owner","outputs":[{"name":"","type":"address"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[],"name":"isOwner","outputs":[{"name":"","type":"bool"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[{"name":"id","type":"uint256"}],"name":"available","outputs":[{"name":"","type":"bool"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[{"name":"to","type":"address"},{"name":"approved","type":"bool"}],"name":"setApprovalForAll","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":false,"inputs":[{"name":"controller","type":"address"}],"name":"addController","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[],"name":"previousRegistrar","outputs":[{"name":"","type":"address"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[{"name":"from","type":"address"},{"name":"to","type":"address"},{"name":"tokenId","type":"uint256"},{"name":"_data","type":"bytes"}],"name":"safeTransferFrom","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[],"name":"GRACE_PERIOD","outputs":[{"name":"","type":"uint256"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[{"name":"id","type":"uint256"},{"name":"duration","type":"uint256"}],"name":"renew","outputs":[{"name":"","type":"uint256"}],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[{"name":"id","type":"uint256"}],"name":"nameExpires","outputs":[{"name":"","type":"uint256"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[{"name":"","type":"address"}],"name":"controllers","outputs":[{"name":"","type":"bool"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[],"name":"baseNode","outputs":[{"name":"","type":"bytes32"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[{"name":"owner","type":"address"},{"name":"operator","type":"address"}],"name":"isApprovedForAll","outputs":[{"name":"","type":"bool"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[{"name":"label","type":"bytes32"},{"name":"deed","type":"address"},{"name":"","type":"uint256"}],"name":"acceptRegistrarTransfer","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":false,"inputs":[{"name":"newOwner","type":"address"}],"name":"transferOwnership","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":false,"inputs":[{"name":"controller","type":"address"}],"name":"removeController","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":false,"inputs":[{"name":"id","type":"uint256"},{"name":"owner","type":"address"},{"name":"duration","type":"uint256"}],"name":"register","outputs":[{"name":"","type":"uint256"}],"payable":false,"stateMutability":"nonpayable","type":"function"},{"inputs":[{"name":"_ens","type":"address"},{"name":"_previousRegistrar","type":"address"},{"name":"_baseNode","type":"bytes32"},{"name":"_transferPeriodEnds","type":"uint256"}],"payable":false,"stateMutability":"nonpayable","type":"constructor"},{"anonymous":false,"inputs":[{"indexed":true,"name":"controller","type":"address"}],"name":"ControllerAdded","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"controller","type":"address"}],"name":"ControllerRemoved","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"id","type":"uint256"},{"indexed":true,"name":"owner","type":"address"},{"indexed":false,"name":"expires","type":"uint256"}],"name":"NameMigrated","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"id","type":"uint256"},{"indexed":true,"name":"owner","type":"address"},{"indexed":false,"name":"expires","type":"uint256"}],"name":"NameRegistered","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"id","type":"uint256"},{"indexed":false,"name":"expires","type":"uint256"}],"name":"NameRenewed","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"previousOwner","type":"address"},{"indexed":true,"name":"newOwner","type":"address"}],"name":"OwnershipTransferred","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"from","type":"address"},{"indexed":true,"name":"to","type":"address"},{"indexed":true,"name":"tokenId","type":"uint256"}],"name":"Transfer","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"owner","type":"address"},{"indexed":true,"name":"approved","type":"address"},{"indexed":true,"name":"tokenId","type":"uint256"}],"name":"Approval","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"owner","type":"address"},{"indexed":true,"name":"operator","type":"address"},{"indexed":false,"name":"approved","type":"bool"}],"name":"ApprovalForAll","type":"event"}]''')
+# Set by main if --cache is supplied
+cache = None
+cacheBlock = None
 
-REGISTRAR_MIGRATION_ABI = json.loads('''[{"constant":true,"inputs":[],"name":"newENS","outputs":[{"name":"","type":"address"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[],"name":"oldRegistrar","outputs":[{"name":"","type":"address"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[],"name":"newRegistrar","outputs":[{"name":"","type":"address"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[],"name":"legacyRegistrar","outputs":[{"name":"","type":"address"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[],"name":"oldENS","outputs":[{"name":"","type":"address"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[],"name":"baseNode","outputs":[{"name":"","type":"bytes32"}],"payable":false,"stateMutability":"view","type":"function"},{"inputs":[{"name":"_old","type":"address"},{"name":"_new","type":"address"}],"payable":false,"stateMutability":"nonpayable","type":"constructor"},{"constant":false,"inputs":[{"name":"tokenId","type":"uint256"}],"name":"migrate","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":false,"inputs":[{"name":"tokenIds","type":"uint256[]"}],"name":"migrateAll","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":false,"inputs":[{"name":"label","type":"bytes32"}],"name":"migrateLegacy","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":false,"inputs":[{"name":"labels","type":"bytes32[]"}],"name":"migrateAllLegacy","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"}]
-''')
+# Set by main when migrating for real
+journal = None
 
-REGISTRY_ABI = json.loads('''[{"constant":true,"inputs":[{"name":"node","type":"bytes32"}],"name":"resolver","outputs":[{"name":"","type":"address"}],"payable":false,"type":"function"},{"constant":true,"inputs":[{"name":"node","type":"bytes32"}],"name":"owner","outputs":[{"name":"","type":"address"}],"payable":false,"type":"function"},{"constant":false,"inputs":[{"name":"node","type":"bytes32"},{"name":"label","type":"bytes32"},{"name":"owner","type":"address"}],"name":"setSubnodeOwner","outputs":[],"payable":false,"type":"function"},{"constant":false,"inputs":[{"name":"node","type":"bytes32"},{"name":"ttl","type":"uint64"}],"name":"setTTL","outputs":[],"payable":false,"type":"function"},{"constant":true,"inputs":[{"name":"node","type":"bytes32"}],"name":"ttl","outputs":[{"name":"","type":"uint64"}],"payable":false,"type":"function"},{"constant":false,"inputs":[{"name":"node","type":"bytes32"},{"name":"resolver","type":"address"}],"name":"setResolver","outputs":[],"payable":false,"type":"function"},{"constant":false,"inputs":[{"name":"node","type":"bytes32"},{"name":"owner","type":"address"}],"name":"setOwner","outputs":[],"payable":false,"type":"function"},{"anonymous":false,"inputs":[{"indexed":true,"name":"node","type":"bytes32"},{"indexed":false,"name":"owner","type":"address"}],"name":"Transfer","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"node","type":"bytes32"},{"indexed":true,"name":"label","type":"bytes32"},{"indexed":false,"name":"owner","type":"address"}],"name":"NewOwner","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"node","type":"bytes32"},{"indexed":false,"name":"resolver","type":"address"}],"name":"NewResolver","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"name":"node","type":"bytes32"},{"indexed":false,"name":"ttl","type":"uint64"}],"name":"NewTTL","type":"event"}]''')
+metrics = Metrics()
+# Replacement transactions are bumped to at most this multiple of --gasprice unless --maxgasprice is given
+DEFAULT_MAX_GAS_PRICE_FACTOR = 4
+# Groups of each registrar a dry run estimates one at a time, to fit the gas model, before estimating concurrently
+PLAN_SEED_GROUPS = 2
+# Times each journaled batch's transaction was first sent, for measuring confirmation lag
+sendTimes = {}
 
-RESOLVER_ABI = json.loads('''[{"constant":true,"inputs":[{"internalType":"bytes4","name":"interfaceID","type":"bytes4"}],"name":"supportsInterface","outputs":[{"internalType":"bool","name":"","type":"bool"}],"payable":false,"stateMutability":"pure","type":"function"},{"constant":false,"inputs":[{"internalType":"bytes32","name":"node","type":"bytes32"},{"internalType":"string","name":"key","type":"string"},{"internalType":"string","name":"value","type":"string"}],"name":"setText","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[{"internalType":"bytes32","name":"node","type":"bytes32"},{"internalType":"bytes4","name":"interfaceID","type":"bytes4"}],"name":"interfaceImplementer","outputs":[{"internalType":"address","name":"","type":"address"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[{"internalType":"bytes32","name":"node","type":"bytes32"},{"internalType":"uint256","name":"contentTypes","type":"uint256"}],"name":"ABI","outputs":[{"internalType":"uint256","name":"","type":"uint256"},{"internalType":"bytes","name":"","type":"bytes"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[{"internalType":"bytes32","name":"node","type":"bytes32"},{"internalType":"bytes32","name":"x","type":"bytes32"},{"internalType":"bytes32","name":"y","type":"bytes32"}],"name":"setPubkey","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":false,"inputs":[{"internalType":"bytes32","name":"node","type":"bytes32"},{"internalType":"bytes","name":"hash","type":"bytes"}],"name":"setContenthash","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[{"internalType":"bytes32","name":"node","type":"bytes32"}],"name":"addr","outputs":[{"internalType":"address","name":"","type":"address"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[{"internalType":"bytes32","name":"node","type":"bytes32"},{"internalType":"address","name":"target","type":"address"},{"internalType":"bool","name":"isAuthorised","type":"bool"}],"name":"setAuthorisation","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[{"internalType":"bytes32","name":"node","type":"bytes32"},{"internalType":"string","name":"key","type":"string"}],"name":"text","outputs":[{"internalType":"string","name":"","type":"string"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[{"internalType":"bytes32","name":"node","type":"bytes32"},{"internalType":"uint256","name":"contentType","type":"uint256"},{"internalType":"bytes","name":"data","type":"bytes"}],"name":"setABI","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[{"internalType":"bytes32","name":"node","type":"bytes32"}],"name":"name","outputs":[{"internalType":"string","name":"","type":"string"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[{"internalType":"bytes32","name":"node","type":"bytes32"},{"internalType":"string","name":"name","type":"string"}],"name":"setName","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":false,"inputs":[{"internalType":"bytes32","name":"node","type":"bytes32"},{"internalType":"uint256","name":"coinType","type":"uint256"},{"internalType":"bytes","name":"a","type":"bytes"}],"name":"setAddr","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[{"internalType":"bytes32","name":"node","type":"bytes32"}],"name":"contenthash","outputs":[{"internalType":"bytes","name":"","type":"bytes"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[{"internalType":"bytes32","name":"node","type":"bytes32"}],"name":"pubkey","outputs":[{"internalType":"bytes32","name":"x","type":"bytes32"},{"internalType":"bytes32","name":"y","type":"bytes32"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[{"internalType":"bytes32","name":"node","type":"bytes32"},{"internalType":"address","name":"a","type":"address"}],"name":"setAddr","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":false,"inputs":[{"internalType":"bytes32","name":"node","type":"bytes32"},{"internalType":"bytes4","name":"interfaceID","type":"bytes4"},{"internalType":"address","name":"implementer","type":"address"}],"name":"setInterface","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[{"internalType":"bytes32","name":"node","type":"bytes32"},{"internalType":"uint256","name":"coinType","type":"uint256"}],"name":"addr","outputs":[{"internalType":"bytes","name":"","type":"bytes"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[{"internalType":"bytes32","name":"","type":"bytes32"},{"internalType":"address","name":"","type":"address"},{"internalType":"address","name":"","type":"address"}],"name":"authorisations","outputs":[{"internalType":"bool","name":"","type":"bool"}],"payable":false,"stateMutability":"view","type":"function"},{"inputs":[{"internalType":"contract ENS","name":"_ens","type":"address"}],"payable":false,"stateMutability":"nonpayable","type":"constructor"},{"anonymous":false,"inputs":[{"indexed":true,"internalType":"bytes32","name":"node","type":"bytes32"},{"indexed":true,"internalType":"address","name":"owner","type":"address"},{"indexed":true,"internalType":"address","name":"target","type":"address"},{"indexed":false,"internalType":"bool","name":"isAuthorised","type":"bool"}],"name":"AuthorisationChanged","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"internalType":"bytes32","name":"node","type":"bytes32"},{"indexed":false,"internalType":"string","name":"indexedKey","type":"string"},{"indexed":false,"internalType":"string","name":"key","type":"string"}],"name":"TextChanged","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"internalType":"bytes32","name":"node","type":"bytes32"},{"indexed":false,"internalType":"bytes32","name":"x","type":"bytes32"},{"indexed":false,"internalType":"bytes32","name":"y","type":"bytes32"}],"name":"PubkeyChanged","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"internalType":"bytes32","name":"node","type":"bytes32"},{"indexed":false,"internalType":"string","name":"name","type":"string"}],"name":"NameChanged","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"internalType":"bytes32","name":"node","type":"bytes32"},{"indexed":true,"internalType":"bytes4","name":"interfaceID","type":"bytes4"},{"indexed":false,"internalType":"address","name":"implementer","type":"address"}],"name":"InterfaceChanged","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"internalType":"bytes32","name":"node","type":"bytes32"},{"indexed":false,"internalType":"bytes","name":"hash","type":"bytes"}],"name":"ContenthashChanged","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"internalType":"bytes32","name":"node","type":"bytes32"},{"indexed":false,"internalType":"address","name":"a","type":"address"}],"name":"AddrChanged","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"internalType":"bytes32","name":"node","type":"bytes32"},{"indexed":false,"internalType":"uint256","name":"coinType","type":"uint256"},{"indexed":false,"internalType":"bytes","name":"newAddress","type":"bytes"}],"name":"AddressChanged","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"internalType":"bytes32","name":"node","type":"bytes32"},{"indexed":true,"internalType":"uint256","name":"contentType","type":"uint256"}],"name":"ABIChanged","type":"event"}]''')
 
-CONTROLLER_ABI = json.loads('''[{"constant":true,"inputs":[{"internalType":"bytes4","name":"interfaceID","type":"bytes4"}],"name":"supportsInterface","outputs":[{"internalType":"bool","name":"","type":"bool"}],"payable":false,"stateMutability":"pure","type":"function"},{"constant":false,"inputs":[],"name":"withdraw","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[{"internalType":"string","name":"name","type":"string"},{"internalType":"address","name":"owner","type":"address"},{"internalType":"bytes32","name":"secret","type":"bytes32"},{"internalType":"address","name":"resolver","type":"address"},{"internalType":"address","name":"addr","type":"address"}],"name":"makeCommitmentWithConfig","outputs":[{"internalType":"bytes32","name":"","type":"bytes32"}],"payable":false,"stateMutability":"pure","type":"function"},{"constant":false,"inputs":[{"internalType":"contract PriceOracle","name":"_prices","type":"address"}],"name":"setPriceOracle","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":false,"inputs":[],"name":"renounceOwnership","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":false,"inputs":[{"internalType":"uint256","name":"_minCommitmentAge","type":"uint256"},{"internalType":"uint256","name":"_maxCommitmentAge","type":"uint256"}],"name":"setCommitmentAges","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[{"internalType":"bytes32","name":"","type":"bytes32"}],"name":"commitments","outputs":[{"internalType":"uint256","name":"","type":"uint256"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[{"internalType":"string","name":"name","type":"string"},{"internalType":"uint256","name":"duration","type":"uint256"}],"name":"rentPrice","outputs":[{"internalType":"uint256","name":"","type":"uint256"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[{"internalType":"string","name":"name","type":"string"},{"internalType":"address","name":"owner","type":"address"},{"internalType":"uint256","name":"duration","type":"uint256"},{"internalType":"bytes32","name":"secret","type":"bytes32"}],"name":"register","outputs":[],"payable":true,"stateMutability":"payable","type":"function"},{"constant":true,"inputs":[],"name":"MIN_REGISTRATION_DURATION","outputs":[{"internalType":"uint256","name":"","type":"uint256"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[],"name":"minCommitmentAge","outputs":[{"internalType":"uint256","name":"","type":"uint256"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[],"name":"owner","outputs":[{"internalType":"address","name":"","type":"address"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[],"name":"isOwner","outputs":[{"internalType":"bool","name":"","type":"bool"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[{"internalType":"string","name":"name","type":"string"}],"name":"valid","outputs":[{"internalType":"bool","name":"","type":"bool"}],"payable":false,"stateMutability":"pure","type":"function"},{"constant":false,"inputs":[{"internalType":"string","name":"name","type":"string"},{"internalType":"uint256","name":"duration","type":"uint256"}],"name":"renew","outputs":[],"payable":true,"stateMutability":"payable","type":"function"},{"constant":true,"inputs":[{"internalType":"string","name":"name","type":"string"}],"name":"available","outputs":[{"internalType":"bool","name":"","type":"bool"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":true,"inputs":[],"name":"maxCommitmentAge","outputs":[{"internalType":"uint256","name":"","type":"uint256"}],"payable":false,"stateMutability":"view","type":"function"},{"constant":false,"inputs":[{"internalType":"bytes32","name":"commitment","type":"bytes32"}],"name":"commit","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":false,"inputs":[{"internalType":"address","name":"newOwner","type":"address"}],"name":"transferOwnership","outputs":[],"payable":false,"stateMutability":"nonpayable","type":"function"},{"constant":true,"inputs":[{"internalType":"string","name":"name","type":"string"},{"internalType":"address","name":"owner","type":"address"},{"internalType":"bytes32","name":"secret","type":"bytes32"}],"name":"makeCommitment","outputs":[{"internalType":"bytes32","name":"","type":"bytes32"}],"payable":false,"stateMutability":"pure","type":"function"},{"constant":false,"inputs":[{"internalType":"string","name":"name","type":"string"},{"internalType":"address","name":"owner","type":"address"},{"internalType":"uint256","name":"duration","type":"uint256"},{"internalType":"bytes32","name":"secret","type":"bytes32"},{"internalType":"address","name":"resolver","type":"address"},{"internalType":"address","name":"addr","type":"address"}],"name":"registerWithConfig","outputs":[],"payable":true,"stateMutability":"payable","type":"function"},{"inputs":[{"internalType":"contract BaseRegistrar","name":"_base","type":"address"},{"internalType":"contract PriceOracle","name":"_prices","type":"address"},{"internalType":"uint256","name":"_minCommitmentAge","type":"uint256"},{"internalType":"uint256","name":"_maxCommitmentAge","type":"uint256"}],"payable":false,"stateMutability":"nonpayable","type":"constructor"},{"anonymous":false,"inputs":[{"indexed":false,"internalType":"string","name":"name","type":"string"},{"indexed":true,"internalType":"bytes32","name":"label","type":"bytes32"},{"indexed":true,"internalType":"address","name":"owner","type":"address"},{"indexed":false,"internalType":"uint256","name":"cost","type":"uint256"},{"indexed":false,"internalType":"uint256","name":"expires","type":"uint256"}],"name":"NameRegistered","type":"event"},{"anonymous":false,"inputs":[{"indexed":false,"internalType":"string","name":"name","type":"string"},{"indexed":true,"internalType":"bytes32","name":"label","type":"bytes32"},{"indexed":false,"internalType":"uint256","name":"cost","type":"uint256"},{"indexed":false,"internalType":"uint256","name":"expires","type":"uint256"}],"name":"NameRenewed","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"internalType":"address","name":"oracle","type":"address"}],"name":"NewPriceOracle","type":"event"},{"anonymous":false,"inputs":[{"indexed":true,"internalType":"address","name":"previousOwner","type":"address"},{"indexed":true,"internalType":"address","name":"newOwner","type":"address"}],"name":"OwnershipTransferred","type":"event"}]''')
-
-def get_resume_point():
-    try:
-        with open('lastlabel.txt', 'r') as f:
-            return HexBytes(f.read().strip('\n'))
-    except:
-        return None
-
-
-def save_resume_point(label):
-    with open('lastlabel.txt', 'w') as f:
-        f.write(label.hex())
-
-
-def delete_resume_point():
-    os.unlink("lastlabel.txt")
-
-
-def pool_init(contracts):
+def init_contracts(contracts):
     g = globals()
     for name, address, abi in contracts:
         g[name] = w3.eth.contract(address=address, abi=abi)
 
 
-def get_labels(f, start=None):
+def get_labels(f):
+    """Yields the label hashes in the text file `f`, skipping blank lines as `count_labels` does."""
     size = os.stat(f.fileno()).st_size
-    for i in itertools.count():
+    i = 0
+    while True:
         l = f.readline()
         if not l: return
+        if not l.strip(): continue
         if i % 100 == 0:
             if f.seekable():
                 logger.info("Read %d labels (%.1f%%)", i, (f.tell()/size) * 100)
             else:
                 logger.info("Read %d labels", i)
-        label = HexBytes(l.strip())
-        # Skip labels until we encounter 'start'
-        if start:
-            if label == start:
-                start = None
+        i += 1
+        yield HexBytes(l.strip())
+
+
+def open_labels(path, startIndex=0):
+    """Returns an iterator over the label hashes in `path`, which may be a text or packed label file.
+
+    Iteration begins at record `startIndex`. Packed files are memory-mapped, so
+    this is found without parsing the records that precede it.
+    """
+    f = open(path, 'rb')
+    if is_label_file(f):
+        return LabelFile(f).iter_from(startIndex)
+    f = io.TextIOWrapper(f)
+    return itertools.islice(get_labels(f), startIndex, None)
+
+
+def parse_shard(s):
+    """Parses a shard specification of the form `i/n`, returning (i, n)."""
+    index, count = (int(x) for x in s.split('/'))
+    if not 0 <= index < count:
+        raise ValueError("Shard index must be between 0 and %d" % (count - 1,))
+    return (index, count)
+
+
+def format_shard(shard):
+    return "%d/%d" % (shard if shard is not None else (0, 1))
+
+
+def label_shard(label, count):
+    """Returns the shard of `count` that `label` belongs to, chosen by its hash prefix."""
+    return int.from_bytes(label[:8], byteorder='big') % count
+
+
+def shard_path(path, shard):
+    """Returns the path of `shard`'s own journal or cache, derived from the unsharded path `path`."""
+    if shard is None:
+        return path
+    base, ext = os.path.splitext(path)
+    return "%s.%d-of-%d%s" % (base, shard[0], shard[1], ext)
+
+
+def select_shard(labels, shard, start, indexes=None):
+    """Yields the labels in `shard`, or all labels if it is None.
+
+    If `indexes` is given, the position in the label list of each label yielded
+    is appended to it, with `start` being the position of the first label.
+    """
+    for i, label in enumerate(labels, start):
+        if shard is not None and label_shard(label, shard[1]) != shard[0]:
             continue
+        if indexes is not None:
+            indexes.append(i)
         yield label
 
 
-def _filter_migrated(label):
-    if newRegistrar.functions.nameExpires(int.from_bytes(label, byteorder='big')).call() > 0:
+def count_labels(path):
+    """Returns the number of labels in the text or packed label file at `path`."""
+    with open(path, 'rb') as f:
+        if is_label_file(f):
+            labels = LabelFile(f)
+            count = len(labels)
+            labels.close()
+            return count
+        return sum(1 for line in f if line.strip())
+
+
+async def _name_expires(rpc, registrar, label):
+    return codec.decode_uint(await rpc.call(registrar.address, codec.name_expires(label)))
+
+
+async def _filter_migrated(rpc, label):
+    if await _name_expires(rpc, newRegistrar, label) > 0:
         logging.info("%s is migrated", label.hex())
         return None
     return label
 
-def filter_migrated_labels(pool, labels):
-    return filter(bool, pool.imap_unordered(_filter_migrated, labels, 10))
+def filter_migrated_labels(fetcher, labels):
+    return filter(bool, fetcher.imap(_filter_migrated, labels))
+
+
+def _cached_state(label, now):
+    """Returns a cached (category, expires) pair for `label` if it can be relied upon, or None.
+
+    'migrated' is terminal, so needs no further reads. A 'permanent' entry saves
+    reading the old registrar only until the expiry it recorded; the new
+    registrar must still be checked, since the name may have been migrated since.
+    Anything else is re-read in full.
+    """
+    if cache is None:
+        return None
+    entry = cache.get(label)
+    if entry is None:
+        return None
+    category, expires, _ = entry
+    if category == 'migrated' or (category == 'permanent' and expires > now):
+        return (category, expires)
+    return None
 
 
-def _get_migration_data(label):
+def _record(label, category, expires=None):
+    if cache is not None:
+        cache.put(label, category, expires, cacheBlock)
+    return (category, label, datetime.utcfromtimestamp(expires) if expires is not None else None)
+
+
+async def _get_migration_data(rpc, label):
     """Returns a (type, label, expires) tuple, where `type` is 'legacy', 'permanent' or 'unregistered'."""
-    if newRegistrar.functions.nameExpires(int.from_bytes(label, byteorder='big')).call() > 0:
+    now = time.time()
+    cached = _cached_state(label, now)
+    if cached and cached[0] == 'migrated':
         return ('migrated', label, None)
-    expires = baseRegistrar.functions.nameExpires(int.from_bytes(label, byteorder='big')).call()
-    if expires > time.time():
-        return ('permanent', label, datetime.utcfromtimestamp(expires))
-    mode, _, _, _, _ = auctionRegistrar.functions.entries(label).call()
+    if await _name_expires(rpc, newRegistrar, label) > 0:
+        return _record(label, 'migrated')
+    if cached:
+        return ('permanent', label, datetime.utcfromtimestamp(cached[1]))
+    expires = await _name_expires(rpc, baseRegistrar, label)
+    if expires > now:
+        return _record(label, 'permanent', expires)
+    mode = codec.decode_entry_mode(await rpc.call(auctionRegistrar.address, codec.entries(label)))
     if mode == 2: # Owned
-        return ('legacy', label, None)
-    return ('unregistered', label, None)
+        return _record(label, 'legacy')
+    return _record(label, 'unregistered')
+
+
+async def _batch_call(rpc, calls):
+    """Executes a list of (address, calldata) reads in one round trip, returning the raw return data of each."""
+    if multicall is not None:
+        return codec.decode_aggregate(await rpc.call(multicall.address, codec.aggregate(calls)))
+    return await rpc.call_batch(calls)
+
+
+async def _get_migration_data_batch(rpc, labels):
+    """Batched equivalent of `_get_migration_data`, returning a list of (type, label, expires) tuples."""
+    now = time.time()
+    cached = [_cached_state(label, now) for label in labels]
+    ret = [None] * len(labels)
+    check = []
+    for i, label in enumerate(labels):
+        if cached[i] and cached[i][0] == 'migrated':
+            ret[i] = ('migrated', label, None)
+        else:
+            check.append(i)
+    uncached = [i for i in check if cached[i] is None]
+    if not check:
+        return ret
+
+    results = await _batch_call(rpc,
+        [(newRegistrar.address, codec.name_expires(labels[i])) for i in check] +
+        [(baseRegistrar.address, codec.name_expires(labels[i])) for i in uncached])
+    oldExpiries = dict(zip(uncached, results[len(check):]))
+    remaining = []
+    for i, result in zip(check, results):
+        if codec.decode_uint(result) > 0:
+            ret[i] = _record(labels[i], 'migrated')
+        elif cached[i]:
+            ret[i] = ('permanent', labels[i], datetime.utcfromtimestamp(cached[i][1]))
+        else:
+            expires = codec.decode_uint(oldExpiries[i])
+            if expires > now:
+                ret[i] = _record(labels[i], 'permanent', expires)
+            else:
+                remaining.append(i)
 
+    if remaining:
+        results = await _batch_call(rpc, [(auctionRegistrar.address, codec.entries(labels[i])) for i in remaining])
+        for i, result in zip(remaining, results):
+            if codec.decode_entry_mode(result) == 2: # Owned
+                ret[i] = _record(labels[i], 'legacy')
+            else:
+                ret[i] = _record(labels[i], 'unregistered')
+    return ret
+
+
+def chunks(it, size):
+    it = iter(it)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk: return
+        yield chunk
+
+
+def categorise_labels(fetcher, labels, batchsize=0):
+    """Returns an iterator of (type, label, expires) tuples for `labels`, in input order.
+
+    If `batchsize` is nonzero, the reads for `batchsize` labels at a time are
+    combined into a single JSON-RPC batch, or a single Multicall aggregate call
+    if a multicall contract is configured.
+    """
+    if batchsize:
+        return itertools.chain.from_iterable(fetcher.imap(_get_migration_data_batch, chunks(labels, batchsize)))
+    return fetcher.imap(_get_migration_data, labels)
 
-def categorise_labels(pool, labels):
-    return pool.imap_unordered(_get_migration_data, labels, 10)
+
+def count_categories(entries):
+    """Passes through (type, label, expires) tuples, counting them by type."""
+    for entry in entries:
+        metrics.inc('labels_total', kind=entry[0])
+        yield entry
 
 
 def batch_group_by(entries, key_func, batch_size):
+    """Groups `entries` by key into batches. `batch_size` may be a number, or a function returning the size for a key."""
     groups = defaultdict(list)
     for entry in entries:
         key = key_func(entry)
         group = groups[key]
         group.append(entry)
-        if len(group) >= batch_size:
+        if len(group) >= (batch_size(key) if callable(batch_size) else batch_size):
             yield (key, group)
             groups[key] = []
 
@@ -158,8 +400,79 @@ def parse_duration(s):
     return timedelta(seconds=int(s[:-1]) * multipliers[s[-1]])
 
 
-def verify(args, pool, labels, account):
-    labels = categorise_labels(pool, labels)
+def scan_registrar_logs(fetcher, fromBlock, blocks):
+    """Reconstructs registrar state from logs.
+
+    Returns a tuple of:
+     - The set of label hashes registered on or migrated to the new registrar.
+     - A dict mapping label hashes on the old permanent registrar to the latest
+       expiry its logs record for them.
+     - The set of label hashes with a winning bid revealed on the auction registrar.
+    """
+    toBlock = w3.eth.blockNumber + 1
+    scans = [
+        (newRegistrar.address, NAME_REGISTERED, fromBlock, toBlock),
+        (newRegistrar.address, NAME_MIGRATED, fromBlock, toBlock),
+        (baseRegistrar.address, NAME_REGISTERED, fromBlock, toBlock),
+        (baseRegistrar.address, NAME_MIGRATED, fromBlock, toBlock),
+        (baseRegistrar.address, NAME_RENEWED, fromBlock, toBlock),
+        (auctionRegistrar.address, BID_REVEALED, fromBlock, toBlock),
+    ]
+    newAddress = newRegistrar.address.lower()
+    migrated = set()
+    expiries = {}
+    bids = set()
+    for log in scan_raw_logs(fetcher, scans, blocks):
+        label = bytes.fromhex(raw_label(log))
+        if log['topics'][0] == BID_REVEALED:
+            if raw_word(log, 1) == 2:
+                bids.add(label)
+            continue
+        if log['address'].lower() == newAddress:
+            migrated.add(label)
+        else:
+            # The expiry is the first data word of each of these events
+            expiries[label] = max(expiries.get(label, 0), raw_word(log, 0))
+    logging.info("Found %d names on the new registrar, %d on the old registrar and %d auctioned", len(migrated), len(expiries), len(bids))
+    return (migrated, expiries, bids)
+
+
+def verify_from_logs(args, fetcher, labels, account):
+    """Verifies `labels` against registrar state reconstructed from logs, checking only ambiguous labels with calls."""
+    logFetcher = Fetcher(fetcher.uri, args.logparallelism, metrics=metrics)
+    migrated, expiries, bids = scan_registrar_logs(logFetcher, args.fromblock, args.blocks)
+    now = time.time()
+    margin = args.margin.total_seconds()
+    count = 0
+    ambiguous = []
+    for label in labels:
+        expires = expiries.get(label, 0)
+        if label in migrated:
+            metrics.inc('labels_total', kind='migrated')
+        elif expires > now + margin:
+            metrics.inc('labels_total', kind='permanent')
+            print("%s is not migrated; still on permanent registrar" % (label.hex(),))
+            count += 1
+        elif expires > now - margin or label in bids:
+            # Expiring around now, or possibly still owned on the auction registrar
+            ambiguous.append(label)
+        else:
+            metrics.inc('labels_total', kind='unregistered')
+
+    logging.info("Checking %d labels the logs do not settle", len(ambiguous))
+    for type, label, expires in count_categories(categorise_labels(fetcher, ambiguous, args.rpcbatch)):
+        if type not in ('migrated', 'unregistered'):
+            print("%s is not migrated; still on %s registrar" % (label.hex(), type))
+            count += 1
+    print("%d unmigrated labels found" % (count,))
+    return 0
+
+
+def verify(args, fetcher, labels, account):
+    labels = select_shard(labels, args.shard, args.start)
+    if args.fromlogs:
+        return verify_from_logs(args, fetcher, labels, account)
+    labels = count_categories(categorise_labels(fetcher, labels, args.rpcbatch))
     count = 0
     for type, label, expires in labels:
         if type not in ('migrated', 'unregistered'):
@@ -169,97 +482,426 @@ def verify(args, pool, labels, account):
     return 0
 
 
-def transact_with_retries(call, args=None, retries=3):
-    for retry in range(retries):
+class MigrationCall:
+    """A call to the migration contract with precomputed calldata, usable where a web3 contract function is."""
+    def __init__(self, address, data):
+        self.address = address
+        self.data = data
+
+    def _transaction(self, transaction):
+        tx = dict(transaction or {})
+        if 'from' not in tx and w3.eth.defaultAccount:
+            tx['from'] = w3.eth.defaultAccount
+        tx['to'] = self.address
+        tx['data'] = self.data
+        return tx
+
+    def estimateGas(self, transaction=None):
+        return w3.eth.estimateGas(self._transaction(transaction))
+
+    def buildTransaction(self, transaction=None):
+        return fill_transaction_defaults(w3, self._transaction(transaction))
+
+
+def migration_call(kind, labels):
+    if kind == 'permanent':
+        return MigrationCall(registrarMigration.address, codec.migrate_all(labels))
+    elif kind == 'legacy':
+        return MigrationCall(registrarMigration.address, codec.migrate_all_legacy(labels))
+    raise ValueError("Unrecognised kind: %s" % (kind,))
+
+
+def send_batch(sender, batchId, kind, labels, gas=None):
+    # Journal the transaction before broadcasting it, so that if we die in
+    # between, a restart finds it rather than sending the labels again
+    sender.send(migration_call(kind, labels), batchId, gas, lambda nonce, txhash: journal.submitted(batchId, nonce, txhash))
+    sendTimes[batchId] = time.time()
+    metrics.inc('batches_sent_total', kind=kind)
+    metrics.inc('labels_sent_total', len(labels), kind=kind)
+
+
+def estimate_batches(limit, kind, labels):
+    """Estimates the gas for migrating `labels`, splitting them into smaller batches if needed to stay under `limit`.
+
+    Returns a list of (labels, gas) tuples.
+    """
+    try:
+        gas = migration_call(kind, labels).estimateGas()
+    except ValueError:
+        # Most likely exceeds the block gas limit
+        if len(labels) == 1:
+            raise
+        gas = None
+    if gas is not None and (gas <= limit or len(labels) == 1):
+        return [(labels, gas)]
+    mid = len(labels) // 2
+    if gas is None:
+        logging.info("Splitting batch of %d %s names that failed to estimate", len(labels), kind)
+    else:
+        logging.info("Splitting batch of %d %s names estimated at %d gas", len(labels), kind, gas)
+    return estimate_batches(limit, kind, labels[:mid]) + estimate_batches(limit, kind, labels[mid:])
+
+
+def journal_callback(batchId, status, txhash):
+    metrics.inc('transactions_total', status=status)
+    if status == 'replaced':
+        journal.replaced(batchId, txhash)
+    else:
+        journal.set_status(batchId, status)
+        if batchId in sendTimes:
+            metrics.observe('confirmation_seconds', time.time() - sendTimes.pop(batchId), status=status)
+
+
+def update_confirmations(account):
+    """Updates the status of journaled batches that have been mined or never sent, returning the account's mined nonce.
+
+    Only safe to call while no transactions are being sent.
+    """
+    latest = w3.eth.getTransactionCount(account.address, 'latest')
+    for batchId, txhash in journal.submitted_below(latest):
         try:
-            return call.transact(args)
-        except:
-            if retry == retries - 1:
-                raise
-            logging.exception("Exception sending transaction; retrying")
+            receipt = w3.eth.getTransactionReceipt(txhash)
+        except web3.exceptions.TransactionNotFound:
+            receipt = None
+        if receipt is None:
+            logging.warning("Batch %d transaction %s was replaced", batchId, txhash.hex())
+            journal.set_status(batchId, 'dropped')
+        elif receipt.status == 1:
+            journal.set_status(batchId, 'confirmed')
+        else:
+            logging.error("Batch %d transaction %s failed", batchId, txhash.hex())
+            journal.set_status(batchId, 'failed')
+    for batchId, txhash in journal.submitted_from(latest):
+        try:
+            w3.eth.getTransaction(txhash)
+        except web3.exceptions.TransactionNotFound:
+            # Journaled, but the run stopped before broadcasting it
+            logging.warning("Batch %d transaction %s was never sent", batchId, txhash.hex())
+            journal.set_status(batchId, 'dropped')
+    return latest
 
 
-def migrate(args, pool, labels, account):
-    nonce = w3.eth.getTransactionCount(account.address, 'pending')
-    logging.info("Starting nonce is %d", nonce)
-    if not account and not args.dryrun:
+def track_batch(sender, batchId, kind, labels, nonce, txhash):
+    """Hands a batch a previous run sent, which has not been mined yet, to `sender` to watch and replace as needed."""
+    params = {'from': sender.account.address, 'nonce': nonce, 'gasPrice': sender.gasPrice}
+    try:
+        # Rebuild the same transaction, at the price and gas it was last sent with
+        sent = w3.eth.getTransaction(txhash)
+        params['gasPrice'] = sent.gasPrice
+        params['gas'] = sent.gas
+    except web3.exceptions.TransactionNotFound:
+        pass
+    sender.track(batchId, nonce, migration_call(kind, labels).buildTransaction(params), txhash)
+
+
+def resubmit_unconfirmed(args, fetcher, account, sender):
+    """Resends any journaled batches that were never sent, failed, or were replaced.
+
+    Batches an earlier run sent that are still waiting to be mined are handed to
+    `sender`, so they are watched and replaced like its own.
+    """
+    update_confirmations(account)
+    for batchId, kind, labels, nonce, txhash, status in journal.unconfirmed():
+        if status == 'submitted':
+            logging.info("Tracking unmined batch %d at nonce %d", batchId, nonce)
+            track_batch(sender, batchId, kind, labels, nonce, txhash)
+            continue
+        # Some of the labels may have been migrated, or moved to another registrar,
+        # since; resend the rest with the call for the registrar they are on now
+        remaining = defaultdict(list)
+        for type, label, expires in categorise_labels(fetcher, labels, args.rpcbatch):
+            if type in ('permanent', 'legacy'):
+                remaining[type].append(label)
+        batches = list(remaining.items())
+        for newBatchId, (newKind, newLabels) in zip(journal.supersede(batchId, batches), batches):
+            logging.info("Resubmitting %d of %d names from %s %s batch %d as %s names", len(newLabels), len(labels), status, kind, batchId, newKind)
+            send_batch(sender, newBatchId, newKind, newLabels)
+
+
+def batch_sizer(args, packer):
+    """Returns the batch size argument for `batch_group_by`: fixed, or chosen by `packer` for each registrar."""
+    if packer is None:
+        return args.batchsize
+    return lambda kind: packer.size(kind) if kind in ('permanent', 'legacy') else args.batchsize
+
+
+def plan(args, fetcher, labels, account):
+    """Estimates the gas for every batch a migration would send, concurrently, and reports the projected cost and duration.
+
+    With `--gasfraction`, the first `PLAN_SEED_GROUPS` groups of each registrar
+    are estimated before any more of its groups are formed, so the packer has
+    learned the gas cost per name and later groups are sized as a real run
+    would size them.
+    """
+    blockGasLimit = w3.eth.getBlock('latest').gasLimit
+    packer = None
+    if args.gasfraction:
+        packer = BatchPacker(blockGasLimit, args.gasfraction, args.batchsize, args.maxbatchsize)
+    limit = packer.limit if packer is not None else int(blockGasLimit * 0.95)
+
+    started = time.time()
+    skipped = defaultdict(int)
+    totals = defaultdict(lambda: {'batches': 0, 'labels': 0, 'gas': 0})
+    batches = []
+    seeded = defaultdict(int)
+    def record(kind, indexes, estimates):
+        offset = 0
+        for batch, gas in estimates:
+            if packer is not None:
+                packer.observe(kind, len(batch), gas)
+            totals[kind]['batches'] += 1
+            totals[kind]['labels'] += len(batch)
+            totals[kind]['gas'] += gas
+            batches.append({'kind': kind, 'first': indexes[offset], 'labels': len(batch), 'gas': gas})
+            offset += len(batch)
+
+    # Indexes in the label list of the labels being categorised, in order
+    positions = collections.deque()
+    labels = select_shard(labels, args.shard, args.start, positions)
+    entries = ((positions.popleft(), entry) for entry in count_categories(categorise_labels(fetcher, labels, args.rpcbatch)))
+    groups = batch_group_by(entries, lambda entry: entry[1][0], batch_sizer(args, packer))
+    with ThreadPoolExecutor(args.parallelism) as executor:
+        pending = collections.deque()
+        try:
+            for kind, group in groups:
+                if kind in ('unregistered', 'migrated'):
+                    skipped[kind] += len(group)
+                    continue
+                labels = [label for i, (kind, label, expires) in group]
+                indexes = [i for i, entry in group]
+                if packer is not None and seeded[kind] < PLAN_SEED_GROUPS:
+                    # Seed the gas model before sizing the next group of this kind
+                    seeded[kind] += 1
+                    record(kind, indexes, estimate_batches(limit, kind, labels))
+                    continue
+                pending.append((kind, indexes, executor.submit(estimate_batches, limit, kind, labels)))
+                if len(pending) >= args.parallelism * 2:
+                    kind, indexes, future = pending.popleft()
+                    record(kind, indexes, future.result())
+            while pending:
+                kind, indexes, future = pending.popleft()
+                record(kind, indexes, future.result())
+        finally:
+            for kind, indexes, future in pending:
+                future.cancel()
+    elapsed = time.time() - started
+
+    gasPrice = int(args.gasprice * 1000000000)
+    totalGas = sum(total['gas'] for total in totals.values())
+    # Each block can carry at most a block's worth of gas, and the sender waits
+    # for a transaction to be mined before sending more once `window` are outstanding.
+    blocks = max(-(-totalGas // blockGasLimit), -(-len(batches) // args.window)) if batches else 0
+    report = {
+        'source': os.path.abspath(args.hashes),
+        'start': args.start,
+        'labels': sum(skipped.values()) + sum(total['labels'] for total in totals.values()),
+        'skipped': dict(skipped),
+        'kinds': dict(totals),
+        'gas': totalGas,
+        'gasPrice': gasPrice,
+        'cost': totalGas * gasPrice,
+        'blockGasLimit': blockGasLimit,
+        'window': args.window,
+        'blocks': blocks,
+        'seconds': blocks * args.blocktime,
+        'planSeconds': elapsed,
+        'batches': batches,
+    }
+    for kind, total in sorted(totals.items()):
+        logging.info("%d %s names in %d batches: %d gas", total['labels'], kind, total['batches'], total['gas'])
+    logging.info("Skipped %d migrated and %d unregistered names", skipped['migrated'], skipped['unregistered'])
+    logging.info("Total %d gas, costing %.4f ETH at %.2f gwei", totalGas, report['cost'] / 1e18, args.gasprice)
+    logging.info("Projected to take at least %d blocks (%s) with a window of %d", blocks, timedelta(seconds=report['seconds']), args.window)
+    if args.plan is not None:
+        with open(args.plan, 'w') as f:
+            json.dump(report, f, indent=2)
+        logging.info("Wrote plan to %s", args.plan)
+    return 0
+
+
+def migrate(args, fetcher, labels, account):
+    if args.dryrun:
+        return plan(args, fetcher, labels, account)
+    if not account:
         logging.error("Either --dryrun or --privatekey must be supplied")
         return 1
 
-    #labels = filter_migrated_labels(pool, labels)
-    entries = categorise_labels(pool, labels)
-    groups = batch_group_by(entries, lambda entry: entry[0], args.batchsize)
-    last = None
-    gasPrice = int(args.gasprice * 1000000000)
+    nonce = w3.eth.getTransactionCount(account.address, 'pending')
+    logging.info("Starting nonce is %d", nonce)
+    sender = TransactionSender(
+        w3, account, nonce, int(args.gasprice * 1000000000), journal_callback,
+        window=args.window,
+        timeout=args.replaceafter,
+        bump=args.gasbump,
+        maxGasPrice=int((args.maxgasprice or args.gasprice * DEFAULT_MAX_GAS_PRICE_FACTOR) * 1000000000))
+    metrics.gauge('pending_transactions', sender.pending)
+    metrics.set('transaction_window', args.window)
+
+    # Track the indexes of labels that have been categorised but not yet handled,
+    # so the journal cursor only ever covers a clean prefix of the label list.
+    # Labels in other shards are skipped, so indexes are recorded as labels are read.
+    positions = collections.deque()
+    labels = select_shard(labels, args.shard, args.start, positions)
+    outstanding = set()
+    nextIndex = args.start
+    def track(entries):
+        nonlocal nextIndex
+        for entry in entries:
+            i = positions.popleft()
+            outstanding.add(i)
+            nextIndex = i + 1
+            yield (i, entry)
+
+    packer = None
+    if args.gasfraction:
+        packer = BatchPacker(w3.eth.getBlock('latest').gasLimit, args.gasfraction, args.batchsize, args.maxbatchsize)
+        logging.info("Targeting %d gas per batch", packer.target)
+
+    #labels = filter_migrated_labels(fetcher, labels)
+    entries = track(count_categories(categorise_labels(fetcher, labels, args.rpcbatch)))
+    groups = batch_group_by(entries, lambda entry: entry[1][0], batch_sizer(args, packer))
     try:
+        resubmit_unconfirmed(args, fetcher, account, sender)
         for kind, group in groups:
-            if kind == 'unregistered':
-                logging.info("Skipping %d unregistered names", len(group))
-                continue
-            if kind == 'migrated':
-                logging.info("Skipping %d already migrated names", len(group))
+            outstanding.difference_update(i for i, entry in group)
+            cursor = min(outstanding) if outstanding else nextIndex
+            if kind in ('unregistered', 'migrated'):
+                if kind == 'unregistered':
+                    logging.info("Skipping %d unregistered names", len(group))
+                else:
+                    logging.info("Skipping %d already migrated names", len(group))
+                journal.set_cursor(cursor)
                 continue
-            labels = [label for (kind, label, expires) in group]
+            labels = [label for i, (kind, label, expires) in group]
             logging.info("Migrating %s names from the %s registrar", len(group), kind)
-            if kind == 'permanent':
-                labels = [int.from_bytes(label, byteorder='big') for label in labels]
-                if args.dryrun:
-                    registrarMigration.functions.migrateAll(labels).estimateGas()
-                else:
-                    tx = transact_with_retries(registrarMigration.functions.migrateAll(labels), {'nonce': nonce, 'gasPrice': gasPrice})
-                    nonce += 1
-                    logging.info("Sent tx %s", tx.hex())
-            elif kind == 'legacy':
-                if args.dryrun:
-                    registrarMigration.functions.migrateAllLegacy(labels).estimateGas()
-                else:
-                    tx = transact_with_retries(registrarMigration.functions.migrateAllLegacy(labels), {'nonce': nonce, 'gasPrice': gasPrice})
-                    nonce += 1
-                    logging.info("Sent tx %s", tx.hex())
-            else:
-                logging.error("Unrecognised kind: %s", kind)
-            last = group[-1][1]
-
-            pending = nonce - w3.eth.getTransactionCount(account.address, 'latest')
-            while pending >= 50:
-                logging.warning("%d pending transactions; pausing", pending)
-                time.sleep(14)
-                pending = nonce - w3.eth.getTransactionCount(account.address, 'latest')
+            if packer is None:
+                batchId = journal.add_batch(kind, labels, cursor)
+                send_batch(sender, batchId, kind, labels)
+                continue
+
+            batches = estimate_batches(packer.limit, kind, labels)
+            # Journal every batch before sending any, advancing the cursor with the last
+            batchIds = [journal.add_batch(kind, batch, cursor if i == len(batches) - 1 else None) for i, (batch, gas) in enumerate(batches)]
+            for batchId, (batch, gas) in zip(batchIds, batches):
+                packer.observe(kind, len(batch), gas)
+                send_batch(sender, batchId, kind, batch, min(int(gas * 1.1), packer.blockGasLimit))
+        if args.shard is not None:
+            # Any labels after the shard's last one belong to other shards
+            journal.set_cursor(count_labels(args.hashes))
+
+        logging.info("Waiting for %d pending transactions", sender.pending())
+        sender.wait()
+        # Resend anything that failed or was dropped along the way
+        for retry in range(args.retries):
+            if not journal.unconfirmed():
+                break
+            resubmit_unconfirmed(args, fetcher, account, sender)
+            sender.wait()
+        unconfirmed = journal.unconfirmed()
+        if unconfirmed:
+            logging.error("%d batches of %d names remain unconfirmed after %d retries; run again to resend them",
+                len(unconfirmed), sum(len(labels) for _, _, labels, _, _, _ in unconfirmed), args.retries)
+            return 1
     except:
-        if last:
-            save_resume_point(last)
         logging.exception("Encountered an error")
         return 1
-    delete_resume_point()
+    finally:
+        sender.close()
+    return 0
+
+
+def status(args, fetcher, labels, account):
+    """Reports the progress of each shard of a migration from its journal, and optionally how many labels in each remain unmigrated."""
+    shards = [None] if args.shards == 1 else [(i, args.shards) for i in range(args.shards)]
+    total = count_labels(args.hashes)
+    totals = defaultdict(lambda: [0, 0])
+    for shard in shards:
+        path = shard_path(args.journal, shard)
+        if not os.path.exists(path):
+            print("Shard %s: not started (no journal at %s)" % (format_shard(shard), path))
+            continue
+        shardJournal = Journal(path)
+        try:
+            cursor = shardJournal.get_cursor() or 0
+            counts = shardJournal.counts()
+        finally:
+            shardJournal.close()
+        for batchStatus, (batches, labelCount) in counts.items():
+            totals[batchStatus][0] += batches
+            totals[batchStatus][1] += labelCount
+        print("Shard %s: read %d/%d labels (%.1f%%); %s" % (
+            format_shard(shard), cursor, total, cursor / total * 100 if total else 100,
+            ', '.join("%d %s batches (%d labels)" % (batches, batchStatus, labelCount) for batchStatus, (batches, labelCount) in sorted(counts.items())) or 'no batches'))
+    print("All shards: %s" % (
+        ', '.join("%d %s batches (%d labels)" % (batches, batchStatus, labelCount) for batchStatus, (batches, labelCount) in sorted(totals.items())) or 'no batches',))
+
+    if args.verify:
+        unmigrated = defaultdict(int)
+        for type, label, expires in count_categories(categorise_labels(fetcher, labels, args.rpcbatch)):
+            if type not in ('migrated', 'unregistered'):
+                unmigrated[label_shard(label, args.shards)] += 1
+        for i in range(args.shards):
+            print("Shard %s: %d unmigrated labels" % (format_shard(shards[i]), unmigrated[i]))
+        print("%d unmigrated labels found" % (sum(unmigrated.values()),))
     return 0
 
 
 parser = argparse.ArgumentParser(description="Migrate names to the new ENS registry")
 parser.add_argument('migration', type=str, help="Migration contract address")
-parser.add_argument('hashes', type=argparse.FileType('rt'), help="List of label hashes to migrate or check")
-parser.add_argument('--parallelism', type=int, default=10, help="Number of fetcher processes to run")
+parser.add_argument('hashes', type=str, help="List of label hashes to migrate or check, as text or a packed label file")
+parser.add_argument('--parallelism', type=int, default=50, help="Maximum number of concurrent RPC requests")
 parser.add_argument('--dryrun', default=False, action='store_true')
 parser.add_argument('--privatekey', type=str, help="Hexadecimal private key")
-#parser.add_argument('--start', type=str, default=None, help="Skip any hashes before 'start'")
+parser.add_argument('--rpcbatch', type=int, default=0, help="Number of labels to categorise per batched request (0 to fetch each label separately)")
+parser.add_argument('--cache', type=str, default=None, help="Path to a label state cache, used to skip reads for labels already known to be migrated; with --shard, the shard's cache is named after it")
+parser.add_argument('--multicall', type=str, default=None, help="Address of a Multicall contract to aggregate batched reads through, instead of JSON-RPC batches")
+parser.add_argument('--start', type=int, default=None, help="Index of the first label to process, overriding the journal's resume point")
+parser.add_argument('--shard', type=parse_shard, default=None, help="Only process shard i of n of the label list, given as i/n")
+parser.add_argument('--metricsport', type=int, default=None, help="Port to serve metrics on, in the Prometheus text format")
+parser.add_argument('--metricsfile', type=str, default=None, help="File to periodically write a JSON snapshot of metrics to")
+parser.add_argument('--metricsinterval', type=float, default=60, help="Seconds between progress reports")
 
 subparsers = parser.add_subparsers()
 
 migrate_parser = subparsers.add_parser('migrate', help='Migrate names')
-migrate_parser.add_argument('--batchsize', type=int, default=100, help="Number of entries to migrate per batch")
+migrate_parser.add_argument('--batchsize', type=int, default=100, help="Number of entries to migrate per batch, or in the first batch of each kind with --gasfraction")
+migrate_parser.add_argument('--gasfraction', type=float, default=0.3, help="Fraction of the block gas limit to size batches to, learning the gas cost per name from estimates (0 to use a fixed --batchsize)")
+migrate_parser.add_argument('--maxbatchsize', type=int, default=1000, help="Maximum number of entries per batch with --gasfraction")
 migrate_parser.add_argument('--gasprice', type=float, default=1.0, help="Gas price, in gwei")
+migrate_parser.add_argument('--window', type=int, default=50, help="Maximum number of unconfirmed transactions to have outstanding at once")
+migrate_parser.add_argument('--replaceafter', type=int, default=180, help="Seconds to wait for a transaction to be mined before resending it with a higher gas price")
+migrate_parser.add_argument('--gasbump', type=float, default=1.125, help="Factor to multiply the gas price of a replacement transaction by")
+migrate_parser.add_argument('--maxgasprice', type=float, default=None, help="Maximum gas price to bump replacement transactions to, in gwei (default: %d times --gasprice)" % (DEFAULT_MAX_GAS_PRICE_FACTOR,))
+migrate_parser.add_argument('--retries', type=int, default=3, help="Number of times to resend batches that fail or are dropped during a run before exiting with an error")
+migrate_parser.add_argument('--blocktime', type=float, default=13, help="Average block interval in seconds, used to project the duration of a migration with --dryrun")
+migrate_parser.add_argument('--plan', type=str, default=None, help="With --dryrun, path to write the migration plan to, as JSON")
+migrate_parser.add_argument('--journal', type=str, default='migration.journal', help="Path to the journal recording the progress of the migration; with --shard, the shard's journal is named after it")
 migrate_parser.set_defaults(func=migrate)
 
 verify_parser = subparsers.add_parser('verify', help='Verify all the provided hashes are migrated')
+verify_parser.add_argument('--fromlogs', default=False, action='store_true', help="Verify against registrar state reconstructed from logs, only calling the registrars for labels the logs leave in doubt")
+verify_parser.add_argument('--fromblock', type=int, default=0, help="With --fromlogs, block to start scanning logs from")
+verify_parser.add_argument('--blocks', type=int, default=5000, help="With --fromlogs, number of blocks to request logs for at once")
+verify_parser.add_argument('--logparallelism', type=int, default=8, help="With --fromlogs, maximum number of concurrent log requests")
+verify_parser.add_argument('--margin', type=parse_duration, default='1d', help="With --fromlogs, names expiring within this long of now are checked with calls (e.g. 12h, 1d)")
 verify_parser.set_defaults(func=verify)
 
+status_parser = subparsers.add_parser('status', help='Report the progress of a migration, merging the journals of all its shards')
+status_parser.add_argument('--shards', type=int, default=1, help="Number of shards the migration was split into")
+status_parser.add_argument('--journal', type=str, default='migration.journal', help="Journal path given to each shard")
+status_parser.add_argument('--verify', default=False, action='store_true', help="Also count the unmigrated labels in each shard")
+status_parser.set_defaults(func=status)
+
 
 def main(args):
+    global cache, cacheBlock, journal
+    instrument_provider(w3.provider, metrics)
     account = None
     if args.privatekey is not None:
         account = Account.privateKeyToAccount(args.privatekey)
         w3.middleware_onion.add(web3.middleware.construct_sign_and_send_raw_middleware(account))
         w3.eth.defaultAccount = account.address
-    registrarMigration = w3.eth.contract(address=args.migration, abi=REGISTRAR_MIGRATION_ABI)
+    registrarMigration = w3.eth.contract(address=args.migration, abi=abis.REGISTRAR_MIGRATION_ABI)
     auctionRegistrarAddress = registrarMigration.functions.legacyRegistrar().call()
     logging.info("Auction registrar at %s", auctionRegistrarAddress)
     baseRegistrarAddress = registrarMigration.functions.oldRegistrar().call()
@@ -267,19 +909,48 @@ def main(args):
     newRegistrarAddress = registrarMigration.functions.newRegistrar().call()
     logging.info("New registrar at %s", newRegistrarAddress)
     contracts = [
-        ('registrarMigration', args.migration, REGISTRAR_MIGRATION_ABI),
-        ('auctionRegistrar', auctionRegistrarAddress, AUCTION_REGISTRAR_ABI),
-        ('baseRegistrar', baseRegistrarAddress, BASE_REGISTRAR_ABI),
-        ('newRegistrar', newRegistrarAddress, BASE_REGISTRAR_ABI),
+        ('registrarMigration', args.migration, abis.REGISTRAR_MIGRATION_ABI),
+        ('auctionRegistrar', auctionRegistrarAddress, abis.AUCTION_REGISTRAR_ABI),
+        ('baseRegistrar', baseRegistrarAddress, abis.BASE_REGISTRAR_ABI),
+        ('newRegistrar', newRegistrarAddress, abis.BASE_REGISTRAR_ABI),
     ]
-    pool_init(contracts)
-    pool = multiprocessing.pool.Pool(args.parallelism, pool_init, (contracts,))
-
-    start = get_resume_point()
-    if start:
-        logging.info("Resuming at label %s", start.hex())
-    labels = get_labels(args.hashes, start)
-    sys.exit(args.func(args, pool, labels, account))
+    if args.multicall is not None:
+        contracts.append(('multicall', args.multicall, abis.MULTICALL_ABI))
+    init_contracts(contracts)
+    if args.cache is not None:
+        cache = LabelCache(shard_path(args.cache, args.shard))
+        cacheBlock = w3.eth.blockNumber
+    fetcher = Fetcher(os.environ.get('WEB3_PROVIDER_URI', 'http://localhost:8545'), args.parallelism, metrics=metrics)
+
+    if args.func is migrate and not args.dryrun:
+        journal = Journal(shard_path(args.journal, args.shard))
+        journal.check_source(os.path.abspath(args.hashes))
+        if account is not None:
+            journal.check_sender(format_shard(args.shard), account.address)
+        if args.start is None and journal.get_cursor() is not None:
+            args.start = journal.get_cursor()
+            logging.info("Resuming at label index %d", args.start)
+    if args.start is None:
+        args.start = 0
+    labels = open_labels(args.hashes, args.start)
+    metrics.total = max(0, count_labels(args.hashes) - args.start)
+    if args.shard is not None:
+        # Label hashes are uniformly distributed, so shards are close to equal
+        metrics.total //= args.shard[1]
+    metrics.started = time.time()
+    if args.metricsport is not None:
+        serve_metrics(metrics, args.metricsport)
+    reporter = Reporter(metrics, args.metricsinterval, args.metricsfile)
+    reporter.start()
+    try:
+        ret = args.func(args, fetcher, labels, account)
+    finally:
+        reporter.stop()
+        if cache is not None:
+            cache.close()
+        if journal is not None:
+            journal.close()
+    sys.exit(ret)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+import argparse
+from eth_abi import decode_abi, encode_abi
+from eth_account import Account
+from eth_utils import event_signature_to_log_topic, function_signature_to_4byte_selector, keccak, to_checksum_address
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+from labelfile import LabelFile
+import logging
+import random
+import rlp
+import threading
+import time
+
+"""
+A mock JSON-RPC node serving synthetic ENS registrar state, for benchmarking
+migrate.py and get_names.py without a real chain.
+
+Usage:
+
+  python3 mocknode.py --port 8545 --latency 0.05 --jitter 0.02 --errors 0.01 --logs 100000
+
+The node answers the reads migrate.py makes of the migration contract, the old
+and new registrars, the auction registrar and a Multicall contract, at the fixed
+addresses below. Every label hash has a state chosen by its last byte, so any
+list of hashes is a valid label list: 'migrated', 'permanent', 'legacy' or
+'unregistered' for a last byte of 0, 1, 2 or 3 modulo 4.
+
+`--logs` BidRevealed events are spread evenly over `--blocks` blocks on the
+auction registrar. Given a packed label file with `--labels`, the node also
+serves logs consistent with each label's state: NameMigrated on the new
+registrar for migrated labels, NameRegistered on the old registrar for
+permanent ones and a winning BidRevealed for legacy ones. Logs are generated on
+demand rather than held in memory, and always describe the initial states. Log
+queries matching more than `--maxresults` logs are rejected, as most nodes do.
+
+Signed transactions sent with `eth_sendRawTransaction` are mined as soon as
+every lower nonce from the same account is, unless their gas price is below
+`--mingasprice`; a pending transaction can be replaced by one at the same nonce
+paying at least 10% more. A mined migration marks its labels migrated, or
+reverts if any of them is in `MockNode.reverting`. Receipts and transactions can
+be fetched by hash, as from a real node.
+
+Each HTTP request is delayed by `--latency` seconds, plus or minus up to
+`--jitter`, and fails with a 503 response with probability `--errors`. A GET
+request returns counts of the requests and calls served so far, as JSON.
+"""
+
+MIGRATION_ADDRESS = '0x' + '11' * 20
+AUCTION_REGISTRAR_ADDRESS = '0x' + '22' * 20
+BASE_REGISTRAR_ADDRESS = '0x' + '33' * 20
+NEW_REGISTRAR_ADDRESS = '0x' + '44' * 20
+MULTICALL_ADDRESS = '0x' + '55' * 20
+
+CATEGORIES = ('migrated', 'permanent', 'legacy', 'unregistered')
+
+BID_REVEALED_TOPIC = '0x' + event_signature_to_log_topic('BidRevealed(bytes32,address,uint256,uint8)').hex()
+NAME_REGISTERED_TOPIC = '0x' + event_signature_to_log_topic('NameRegistered(uint256,address,uint256)').hex()
+NAME_MIGRATED_TOPIC = '0x' + event_signature_to_log_topic('NameMigrated(uint256,address,uint256)').hex()
+ZERO_WORD = '0x' + '00' * 32
+
+# Gas used by a migration transaction, as `BASE_GAS + LABEL_GAS * labels`
+BASE_GAS = 30000
+LABEL_GAS = 25000
+
+
+def label_category(label):
+    """Returns the synthetic state of the label hash `label`."""
+    return CATEGORIES[label[-1] % 4]
+
+
+def _int(field):
+    return int.from_bytes(field, byteorder='big')
+
+
+class MockNode:
+    def __init__(self, latency=0, jitter=0, errors=0, logs=0, blocks=20000, maxResults=10000, gasLimit=10000000, labels=None, minGasPrice=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.errors = errors
+        self.logs = logs
+        self.blocks = blocks
+        self.maxResults = maxResults
+        self.gasLimit = gasLimit
+        self.now = int(time.time())
+        # Expiry of every registered name
+        self.expires = self.now + 365 * 86400
+        # Each source is a (count, func) pair; func(i) returns the ith log, or None
+        self.logSources = []
+        if logs:
+            self.logSources.append((logs, self._bid_log))
+        if labels is not None:
+            self.logSources.append((len(labels), self._label_log))
+        self.labels = labels
+        self.minGasPrice = minGasPrice
+        # Label hashes whose state differs from `label_category`, such as those migrated by mined transactions
+        self.categories = {}
+        # Label hashes that make any migration including them revert
+        self.reverting = set()
+        # Number of transactions mined from each account, and those waiting by (account, nonce)
+        self.nonces = {}
+        self.pool = {}
+        # Every pending or mined transaction, and the receipts of mined ones, by hash
+        self.transactions = {}
+        self.receipts = {}
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'calls': 0, 'errors': 0}
+        self.calls = {
+            function_signature_to_4byte_selector('legacyRegistrar()'): self._legacy_registrar,
+            function_signature_to_4byte_selector('oldRegistrar()'): self._old_registrar,
+            function_signature_to_4byte_selector('newRegistrar()'): self._new_registrar,
+            function_signature_to_4byte_selector('nameExpires(uint256)'): self._name_expires,
+            function_signature_to_4byte_selector('entries(bytes32)'): self._entries,
+            function_signature_to_4byte_selector('aggregate((address,bytes)[])'): self._aggregate,
+        }
+        self.migrations = {
+            function_signature_to_4byte_selector('migrateAll(uint256[])'): 'uint256[]',
+            function_signature_to_4byte_selector('migrateAllLegacy(bytes32[])'): 'bytes32[]',
+        }
+        self.methods = {
+            'eth_call': self._eth_call,
+            'eth_estimateGas': self._eth_estimate_gas,
+            'eth_getLogs': self._eth_get_logs,
+            'eth_blockNumber': lambda params: hex(self.blocks),
+            'eth_getBlockByNumber': self._eth_get_block_by_number,
+            'eth_chainId': lambda params: '0x539',
+            'net_version': lambda params: '1337',
+            'eth_gasPrice': lambda params: hex(1000000000),
+            'web3_clientVersion': lambda params: 'mocknode',
+            'eth_sendRawTransaction': self._eth_send_raw_transaction,
+            'eth_getTransactionCount': self._eth_get_transaction_count,
+            'eth_getTransactionByHash': lambda params: self.transactions.get(params[0]),
+            'eth_getTransactionReceipt': lambda params: self.receipts.get(params[0]),
+        }
+
+    def _count(self, key, n=1):
+        with self.lock:
+            self.stats[key] += n
+
+    def delay(self):
+        """Returns how long to wait before answering a request."""
+        return max(0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+    def should_fail(self):
+        return self.errors > 0 and random.random() < self.errors
+
+    def handle(self, request):
+        """Returns the JSON-RPC response to a single request object."""
+        self._count('calls')
+        method = self.methods.get(request.get('method'))
+        if method is None:
+            return {'jsonrpc': '2.0', 'id': request.get('id'), 'error': {'code': -32601, 'message': 'Method not found'}}
+        try:
+            result = method(request.get('params', []))
+        except ValueError as e:
+            code = e.args[1] if len(e.args) > 1 else -32000
+            return {'jsonrpc': '2.0', 'id': request.get('id'), 'error': {'code': code, 'message': e.args[0]}}
+        return {'jsonrpc': '2.0', 'id': request.get('id'), 'result': result}
+
+    def category(self, label):
+        """Returns the current state of the label hash `label`."""
+        return self.categories.get(bytes(label), label_category(label))
+
+    def call(self, to, data):
+        call = self.calls.get(data[:4])
+        if call is None:
+            raise ValueError('execution reverted')
+        return call(to.lower(), data[4:])
+
+    def _legacy_registrar(self, to, args):
+        return encode_abi(['address'], [AUCTION_REGISTRAR_ADDRESS])
+
+    def _old_registrar(self, to, args):
+        return encode_abi(['address'], [BASE_REGISTRAR_ADDRESS])
+
+    def _new_registrar(self, to, args):
+        return encode_abi(['address'], [NEW_REGISTRAR_ADDRESS])
+
+    def _name_expires(self, to, args):
+        category = self.category(args[:32])
+        if to == NEW_REGISTRAR_ADDRESS:
+            return encode_abi(['uint256'], [self.expires if category == 'migrated' else 0])
+        return encode_abi(['uint256'], [self.expires if category == 'permanent' else 0])
+
+    def _entries(self, to, args):
+        if to != AUCTION_REGISTRAR_ADDRESS:
+            raise ValueError('execution reverted')
+        mode = 2 if self.category(args[:32]) == 'legacy' else 0
+        return encode_abi(['uint8', 'address', 'uint256', 'uint256', 'uint256'], [mode, '0x' + '00' * 20, 0, 0, 0])
+
+    def _aggregate(self, to, args):
+        (calls,) = decode_abi(['(address,bytes)[]'], args)
+        return encode_abi(['uint256', 'bytes[]'], [self.blocks, [self.call(target, data) for target, data in calls]])
+
+    def _eth_call(self, params):
+        return '0x' + self.call(params[0]['to'], bytes.fromhex(params[0]['data'][2:])).hex()
+
+    def _eth_estimate_gas(self, params):
+        data = bytes.fromhex(params[0]['data'][2:])
+        argType = self.migrations.get(data[:4])
+        if argType is None:
+            raise ValueError('execution reverted')
+        (labels,) = decode_abi([argType], data[4:])
+        gas = BASE_GAS + LABEL_GAS * len(labels)
+        if gas > self.gasLimit:
+            raise ValueError('gas required exceeds allowance (%d)' % (self.gasLimit,))
+        return hex(gas)
+
+    def _eth_send_raw_transaction(self, params):
+        raw = bytes.fromhex(params[0][2:])
+        nonce, gasPrice, gas, to, value, data, v, r, s = rlp.decode(raw)
+        txhash = '0x' + keccak(raw).hex()
+        sender = Account.recover_transaction(raw)
+        nonce = _int(nonce)
+        tx = {
+            'hash': txhash,
+            'nonce': hex(nonce),
+            'blockHash': None,
+            'blockNumber': None,
+            'transactionIndex': None,
+            'from': sender,
+            'to': to_checksum_address(to),
+            'value': hex(_int(value)),
+            'gas': hex(_int(gas)),
+            'gasPrice': hex(_int(gasPrice)),
+            'input': '0x' + data.hex(),
+            'v': hex(_int(v)),
+            'r': hex(_int(r)),
+            's': hex(_int(s)),
+        }
+        with self.lock:
+            if txhash in self.transactions:
+                raise ValueError('already known')
+            if nonce < self.nonces.get(sender, 0):
+                raise ValueError('nonce too low')
+            old = self.pool.get((sender, nonce))
+            if old is not None:
+                if _int(gasPrice) * 10 < int(old['gasPrice'], 16) * 11:
+                    raise ValueError('replacement transaction underpriced')
+                # The replaced transaction is forgotten, as by a real node
+                del self.transactions[old['hash']]
+            self.pool[(sender, nonce)] = tx
+            self.transactions[txhash] = tx
+        self.mine()
+        return txhash
+
+    def _eth_get_transaction_count(self, params):
+        sender = to_checksum_address(params[0])
+        with self.lock:
+            count = self.nonces.get(sender, 0)
+            if params[1] == 'pending':
+                while (sender, count) in self.pool:
+                    count += 1
+        return hex(count)
+
+    def mine(self):
+        """Mines every pending transaction paying at least `minGasPrice` whose lower nonces have all been mined."""
+        with self.lock:
+            for sender, nonce in sorted(self.pool):
+                if nonce != self.nonces.get(sender, 0) or int(self.pool[(sender, nonce)]['gasPrice'], 16) < self.minGasPrice:
+                    continue
+                tx = self.pool.pop((sender, nonce))
+                self.nonces[sender] = nonce + 1
+                self._execute(tx)
+
+    def _execute(self, tx):
+        data = bytes.fromhex(tx['input'][2:])
+        argType = self.migrations.get(data[:4])
+        labels = []
+        if argType is not None and tx['to'].lower() == MIGRATION_ADDRESS:
+            (labels,) = decode_abi([argType], data[4:])
+            labels = [label.to_bytes(32, 'big') if isinstance(label, int) else label for label in labels]
+            success = not self.reverting.intersection(labels)
+        else:
+            success = False
+        if success:
+            for label in labels:
+                self.categories[label] = 'migrated'
+        blockHash = '0x' + keccak(self.blocks.to_bytes(32, 'big')).hex()
+        tx.update(blockHash=blockHash, blockNumber=hex(self.blocks), transactionIndex='0x0')
+        self.receipts[tx['hash']] = {
+            'transactionHash': tx['hash'],
+            'transactionIndex': '0x0',
+            'blockHash': blockHash,
+            'blockNumber': hex(self.blocks),
+            'from': tx['from'],
+            'to': tx['to'],
+            'cumulativeGasUsed': hex(BASE_GAS + LABEL_GAS * len(labels)),
+            'gasUsed': hex(BASE_GAS + LABEL_GAS * len(labels)),
+            'contractAddress': None,
+            'logs': [],
+            'logsBloom': '0x' + '00' * 256,
+            'status': '0x1' if success else '0x0',
+        }
+
+    def _eth_get_block_by_number(self, params):
+        number = self.blocks if params[0] in ('latest', 'pending') else int(params[0], 16)
+        return {
+            'number': hex(number),
+            'hash': '0x' + keccak(number.to_bytes(32, 'big')).hex(),
+            'parentHash': '0x' + keccak((number - 1).to_bytes(32, 'big', signed=True)).hex(),
+            'nonce': '0x' + '00' * 8,
+            'sha3Uncles': ZERO_WORD,
+            'logsBloom': '0x' + '00' * 256,
+            'transactionsRoot': ZERO_WORD,
+            'stateRoot': ZERO_WORD,
+            'receiptsRoot': ZERO_WORD,
+            'miner': '0x' + '00' * 20,
+            'difficulty': '0x1',
+            'totalDifficulty': hex(number),
+            'extraData': '0x',
+            'size': '0x0',
+            'gasLimit': hex(self.gasLimit),
+            'gasUsed': '0x0',
+            'timestamp': hex(self.now),
+            'transactions': [],
+            'uncles': [],
+        }
+
+    def _make_log(self, blockNumber, i, address, topics, data):
+        return {
+            'address': address,
+            'topics': topics,
+            'data': '0x' + data.hex(),
+            'blockNumber': hex(blockNumber),
+            'blockHash': '0x' + keccak(blockNumber.to_bytes(32, 'big')).hex(),
+            'transactionHash': '0x' + keccak(address.encode('ascii') + i.to_bytes(8, 'big')).hex(),
+            'transactionIndex': '0x0',
+            'logIndex': hex(i),
+            'removed': False,
+        }
+
+    def _bid_log(self, blockNumber, i):
+        label = keccak(i.to_bytes(8, 'big'))
+        # Most bids are revealed as the winning bid; the rest are outbid
+        status = 2 if label[-1] % 4 != 3 else 4
+        return self._make_log(blockNumber, i, AUCTION_REGISTRAR_ADDRESS,
+            [BID_REVEALED_TOPIC, '0x' + label.hex(), ZERO_WORD],
+            encode_abi(['uint256', 'uint8'], [10000000000000000, status]))
+
+    def _label_log(self, blockNumber, i):
+        label = bytes(self.labels[i])
+        category = label_category(label)
+        if category == 'migrated':
+            return self._make_log(blockNumber, i, NEW_REGISTRAR_ADDRESS,
+                [NAME_MIGRATED_TOPIC, '0x' + label.hex(), ZERO_WORD], encode_abi(['uint256'], [self.expires]))
+        if category == 'permanent':
+            return self._make_log(blockNumber, i, BASE_REGISTRAR_ADDRESS,
+                [NAME_REGISTERED_TOPIC, '0x' + label.hex(), ZERO_WORD], encode_abi(['uint256'], [self.expires]))
+        if category == 'legacy':
+            return self._make_log(blockNumber, i, AUCTION_REGISTRAR_ADDRESS,
+                [BID_REVEALED_TOPIC, '0x' + label.hex(), ZERO_WORD], encode_abi(['uint256', 'uint8'], [10000000000000000, 2]))
+        return None
+
+    def _eth_get_logs(self, params):
+        query = params[0]
+        fromBlock = max(self._block_number(query.get('fromBlock', 'latest')), 1)
+        toBlock = self._block_number(query.get('toBlock', 'latest'))
+        addresses = query.get('address')
+        if isinstance(addresses, str):
+            addresses = [addresses]
+        if addresses:
+            addresses = set(address.lower() for address in addresses)
+        topics = query.get('topics') or []
+        logs = []
+        for count, func in self.logSources:
+            # The ith log is in block `1 + i * blocks // count`, so these are the logs in [fromBlock, toBlock]
+            first = -(-(fromBlock - 1) * count // self.blocks)
+            last = min(count, -(-toBlock * count // self.blocks))
+            for i in range(first, last):
+                log = func(1 + i * self.blocks // count, i)
+                if log is None or (addresses and log['address'] not in addresses) or not self._match_topics(log['topics'], topics):
+                    continue
+                logs.append(log)
+                if len(logs) > self.maxResults:
+                    raise ValueError('query returned more than %d results' % (self.maxResults,), -32005)
+        return logs
+
+    def _block_number(self, block):
+        if block in ('latest', 'pending'):
+            return self.blocks
+        if block == 'earliest':
+            return 0
+        return int(block, 16)
+
+    def _match_topics(self, logTopics, topics):
+        for topic, logTopic in zip(topics, logTopics):
+            if topic is None:
+                continue
+            if logTopic not in ([topic] if isinstance(topic, str) else topic):
+                return False
+        return True
+
+
+def make_handler(node):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body are written separately; don't let Nagle's algorithm hold the body back
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _respond(self, status, body):
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            node._count('requests')
+            time.sleep(node.delay())
+            if node.should_fail():
+                node._count('errors')
+                self._respond(503, b'{"error":"Service Unavailable"}')
+                return
+            if isinstance(request, list):
+                response = [node.handle(r) for r in request]
+            else:
+                response = node.handle(request)
+            self._respond(200, json.dumps(response).encode('utf-8'))
+
+        def do_GET(self):
+            with node.lock:
+                body = json.dumps(node.stats).encode('utf-8')
+            self._respond(200, body)
+
+    return Handler
+
+
+def serve(node, host='127.0.0.1', port=8545):
+    """Returns an HTTP server for `node`; call `serve_forever` on it to start answering requests."""
+    server = ThreadingHTTPServer((host, port), make_handler(node))
+    server.daemon_threads = True
+    return server
+
+
+parser = argparse.ArgumentParser(description="Run a mock JSON-RPC node with synthetic ENS registrar state")
+parser.add_argument('--host', type=str, default='127.0.0.1')
+parser.add_argument('--port', type=int, default=8545, help="Port to listen on (0 to pick a free port)")
+parser.add_argument('--latency', type=float, default=0, help="Seconds to delay each request by")
+parser.add_argument('--jitter', type=float, default=0, help="Maximum random variation in the delay, in seconds")
+parser.add_argument('--errors', type=float, default=0, help="Fraction of requests to fail with an HTTP 503 error")
+parser.add_argument('--logs', type=int, default=0, help="Number of BidRevealed logs to serve")
+parser.add_argument('--labels', type=str, default=None, help="Packed label file to serve registrar logs for")
+parser.add_argument('--blocks', type=int, default=20000, help="Number of the latest block")
+parser.add_argument('--maxresults', type=int, default=10000, help="Maximum number of logs to return from one query")
+parser.add_argument('--gaslimit', type=int, default=10000000, help="Block gas limit")
+parser.add_argument('--mingasprice', type=float, default=0, help="Minimum gas price to mine a transaction at, in gwei")
+
+
+def main(args):
+    labels = LabelFile(open(args.labels, 'rb')) if args.labels is not None else None
+    node = MockNode(args.latency, args.jitter, args.errors, args.logs, args.blocks, args.maxresults, args.gaslimit, labels, int(args.mingasprice * 1000000000))
+    server = serve(node, args.host, args.port)
+    # Report the address on stdout, so a parent process can find a port picked by the OS
+    print("Listening on http://%s:%d" % server.server_address, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main(parser.parse_args())
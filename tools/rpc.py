@@ -0,0 +1,187 @@
+import aiohttp
+import asyncio
+import collections
+from hexbytes import HexBytes
+import itertools
+import logging
+import queue
+import threading
+import time
+
+"""
+A small asyncio JSON-RPC client and fetch engine for I/O-bound node queries.
+
+`AsyncRPC` talks to a node over a pooled set of keep-alive HTTP connections.
+`Fetcher.imap` runs a coroutine over an iterable of inputs on a background
+event loop, with a bounded number of requests in flight, and yields the results
+to synchronous code in input order. The consumer applies backpressure: once
+`window` results are waiting to be read, no new inputs are started.
+
+Given a `metrics.Metrics`, every HTTP request is recorded there by method, with
+JSON-RPC batches recorded as method 'batch'.
+"""
+
+logger = logging.getLogger('rpc')
+
+RETRY_METHODS = frozenset(['eth_call', 'eth_getLogs', 'eth_blockNumber', 'eth_estimateGas', 'eth_getTransactionCount',
+                           'eth_getTransactionReceipt', 'eth_getBlockByNumber', 'eth_chainId', 'net_version'])
+
+
+class RPCError(ValueError):
+    """An error response returned by the node."""
+    def __init__(self, error):
+        super().__init__(error)
+        self.error = error
+
+
+class AsyncRPC:
+    def __init__(self, uri, concurrency=100, retries=5, timeout=60, metrics=None):
+        self.uri = uri
+        self.retries = retries
+        self.metrics = metrics
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=concurrency, keepalive_timeout=60),
+            timeout=aiohttp.ClientTimeout(total=timeout))
+        self.ids = itertools.count()
+
+    async def close(self):
+        await self.session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def _post(self, payload, retry, method):
+        for attempt in range(self.retries if retry else 1):
+            try:
+                async with self.semaphore:
+                    started = time.time()
+                    async with self.session.post(self.uri, json=payload) as response:
+                        response.raise_for_status()
+                        ret = await response.json(content_type=None)
+                    if self.metrics is not None:
+                        self.metrics.rpc(method, time.time() - started, 'response' if isinstance(ret, dict) and 'error' in ret else None)
+                    return ret
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if self.metrics is not None:
+                    self.metrics.rpc(method, time.time() - started, type(e).__name__)
+                if attempt == self.retries - 1 or not retry:
+                    raise
+                logger.warning("Error making RPC request; retrying", exc_info=True)
+                await asyncio.sleep(0.1 * 2 ** attempt)
+
+    async def request(self, method, params):
+        response = await self._post(
+            {'jsonrpc': '2.0', 'id': next(self.ids), 'method': method, 'params': params},
+            method in RETRY_METHODS, method)
+        if 'error' in response:
+            raise RPCError(response['error'])
+        return response['result']
+
+    async def batch(self, calls):
+        """Sends a list of (method, params) pairs as a single JSON-RPC batch, returning the results in order."""
+        if not calls:
+            return []
+        ids = [next(self.ids) for _ in calls]
+        payload = [{'jsonrpc': '2.0', 'id': id, 'method': method, 'params': params} for id, (method, params) in zip(ids, calls)]
+        response = await self._post(payload, all(method in RETRY_METHODS for method, _ in calls), 'batch')
+        if isinstance(response, dict):
+            # Some nodes reply to a batch they can't process with a single error object
+            raise RPCError(response.get('error', response))
+        results = {}
+        for result in response:
+            if 'error' in result:
+                raise RPCError(result['error'])
+            results[result['id']] = result['result']
+        return [results[id] for id in ids]
+
+    async def call(self, to, data, block='latest'):
+        return HexBytes(await self.request('eth_call', [{'to': to, 'data': data}, block]))
+
+    async def call_batch(self, calls, block='latest'):
+        """Executes a list of (to, data) calls as one batch, returning the return data of each."""
+        results = await self.batch([('eth_call', [{'to': to, 'data': data}, block]) for to, data in calls])
+        return [HexBytes(result) for result in results]
+
+
+class _Failure:
+    def __init__(self, exc):
+        self.exc = exc
+
+
+_DONE = object()
+
+
+class Fetcher:
+    def __init__(self, uri, concurrency=100, window=None, metrics=None):
+        self.uri = uri
+        self.concurrency = concurrency
+        self.window = window or concurrency * 4
+        self.metrics = metrics
+
+    def imap(self, func, items):
+        """Yields `await func(rpc, item)` for each item in `items`, in order.
+
+        `items` is consumed from the event loop thread, so it should not block
+        for long; reading lines from a file is fine.
+        """
+        results = queue.Queue(self.window)
+        stopped = threading.Event()
+        thread = threading.Thread(target=asyncio.run, args=(self._run(func, items, results, stopped),), daemon=True)
+        thread.start()
+        try:
+            while True:
+                result = results.get()
+                if result is _DONE:
+                    break
+                if isinstance(result, _Failure):
+                    raise result.exc
+                yield result
+        finally:
+            stopped.set()
+            thread.join()
+
+    async def _run(self, func, items, results, stopped):
+        async def put(value):
+            """Hands `value` to the consumer, returning False if it has stopped reading."""
+            # Wait for the consumer without tying up a thread, so an abandoned
+            # iteration can't keep the process alive.
+            while not stopped.is_set():
+                try:
+                    results.put_nowait(value)
+                    return True
+                except queue.Full:
+                    await asyncio.sleep(0.01)
+            return False
+        async def put_next():
+            """Hands the oldest request's result to the consumer once it finishes, returning False if the consumer stops reading first."""
+            while not stopped.is_set():
+                done, _ = await asyncio.wait([pending[0]], timeout=0.05)
+                if done:
+                    return await put(pending.popleft().result())
+            return False
+        pending = collections.deque()
+        try:
+            async with AsyncRPC(self.uri, self.concurrency, metrics=self.metrics) as rpc:
+                try:
+                    for item in items:
+                        pending.append(asyncio.ensure_future(func(rpc, item)))
+                        await asyncio.sleep(0)
+                        while len(pending) >= self.window or (pending and pending[0].done()):
+                            if not await put_next():
+                                return
+                    while pending:
+                        if not await put_next():
+                            return
+                finally:
+                    # Finish outstanding requests before the session closes
+                    for task in pending:
+                        task.cancel()
+                    await asyncio.gather(*pending, return_exceptions=True)
+        except Exception as e:
+            await put(_Failure(e))
+            return
+        await put(_DONE)
@@ -0,0 +1,231 @@
+import collections
+import logging
+import queue
+import threading
+import time
+import web3
+
+"""
+Pipelined transaction sending for a single account.
+
+`TransactionSender` owns the account's nonce, so it never needs to ask the node
+which nonce to use next, and keeps up to `window` transactions in flight at
+once. A background thread watches for their receipts. If the transaction at the
+account's next unmined nonce has not been mined within `timeout` seconds, it is
+replaced at the same nonce by a copy with its gas price multiplied by `bump`, up
+to `maxGasPrice`, so one underpriced transaction cannot stall the ones queued
+behind it. Only that transaction is replaced: those behind it are waiting for
+its nonce, not for a higher price.
+
+Status changes are reported by calling `callback(tag, status, txhash)` from the
+thread that calls `send` or `wait`, never from the watcher thread. `status` is
+'confirmed', 'failed' (mined, but reverted), 'replaced' (resent with a higher
+gas price as `txhash`) or 'dropped' (another transaction took the nonce).
+"""
+
+logger = logging.getLogger('sender')
+
+# Most nodes require a replacement to pay at least 10% more than the original
+MIN_BUMP = 1.1
+
+
+class InFlight:
+    def __init__(self, tag, nonce, tx, txhash):
+        self.tag = tag
+        self.nonce = nonce
+        self.tx = tx
+        self.hashes = [txhash]
+        self.sentAt = time.time()
+
+
+class TransactionSender:
+    def __init__(self, w3, account, nonce, gasPrice, callback=None, window=50, timeout=180, bump=1.125, maxGasPrice=None, pollInterval=2, retries=3):
+        if bump < MIN_BUMP:
+            raise ValueError("Gas price bump must be at least %.2f" % (MIN_BUMP,))
+        self.w3 = w3
+        self.account = account
+        self.nonce = nonce
+        self.gasPrice = gasPrice
+        self.callback = callback
+        self.window = window
+        self.timeout = timeout
+        self.bump = bump
+        self.maxGasPrice = maxGasPrice
+        self.pollInterval = pollInterval
+        self.retries = retries
+
+        self.lock = threading.Condition()
+        self.inflight = collections.OrderedDict()
+        self.events = queue.Queue()
+        self.error = None
+        self.stopped = False
+        # The account's lowest unmined nonce, and when it was first seen
+        self.headNonce = None
+        self.headSince = time.time()
+        self.watcher = threading.Thread(target=self._watch, daemon=True)
+        self.watcher.start()
+
+    def pending(self):
+        with self.lock:
+            return len(self.inflight)
+
+    def send(self, call, tag=None, gas=None, onSigned=None):
+        """Sends `call` as a transaction with the next nonce, blocking while the window is full. Returns (nonce, txhash).
+
+        If given, `onSigned(nonce, txhash)` is called once the transaction is
+        signed but before it is broadcast, so the caller can record it first.
+        """
+        with self.lock:
+            while len(self.inflight) >= self.window and self.error is None:
+                self._dispatch()
+                self.lock.wait(self.pollInterval)
+        self._dispatch()
+        if self.error is not None:
+            raise self.error
+
+        params = {'from': self.account.address, 'nonce': self.nonce, 'gasPrice': self.gasPrice}
+        if gas is not None:
+            params['gas'] = gas
+        tx = call.buildTransaction(params)
+        signed = self.account.sign_transaction(tx)
+        if onSigned is not None:
+            onSigned(self.nonce, signed.hash)
+        txhash = self._broadcast(signed)
+        with self.lock:
+            self.inflight[self.nonce] = InFlight(tag, self.nonce, tx, txhash)
+        logger.info("Sent tx %s with nonce %d", txhash.hex(), self.nonce)
+        self.nonce += 1
+        return (self.nonce - 1, txhash)
+
+    def track(self, tag, nonce, tx, txhash):
+        """Watches `tx`, already sent at `nonce` as `txhash` (e.g. by an earlier run), as if `send` had sent it.
+
+        It is reported to the callback, and replaced if it reaches the head of
+        the queue and is not mined, like any other. `nonce` must be below the
+        next nonce this sender will use.
+        """
+        if nonce >= self.nonce:
+            raise ValueError("Nonce %d is not below the sender's next nonce %d" % (nonce, self.nonce))
+        with self.lock:
+            self.inflight[nonce] = InFlight(tag, nonce, tx, txhash)
+        logger.info("Tracking tx %s with nonce %d", txhash.hex(), nonce)
+
+    def wait(self):
+        """Blocks until every transaction sent so far has been mined or dropped."""
+        with self.lock:
+            while self.inflight and self.error is None:
+                self._dispatch()
+                self.lock.wait(self.pollInterval)
+        self._dispatch()
+        if self.error is not None:
+            raise self.error
+
+    def close(self):
+        with self.lock:
+            self.stopped = True
+            self.lock.notify_all()
+        self.watcher.join()
+        self._dispatch()
+
+    def _dispatch(self):
+        while True:
+            try:
+                tag, status, txhash = self.events.get_nowait()
+            except queue.Empty:
+                return
+            if self.callback is not None:
+                self.callback(tag, status, txhash)
+
+    def _send_raw(self, tx):
+        return self._broadcast(self.account.sign_transaction(tx))
+
+    def _broadcast(self, signed):
+        for retry in range(self.retries):
+            try:
+                return self.w3.eth.sendRawTransaction(signed.rawTransaction)
+            except ValueError as e:
+                if 'known' in str(e).lower():
+                    # The node already has this exact transaction
+                    return signed.hash
+                if retry == self.retries - 1:
+                    raise
+                logger.exception("Exception sending transaction; retrying")
+            except Exception:
+                if retry == self.retries - 1:
+                    raise
+                logger.exception("Exception sending transaction; retrying")
+
+    def _receipt(self, txhash):
+        try:
+            return self.w3.eth.getTransactionReceipt(txhash)
+        except web3.exceptions.TransactionNotFound:
+            return None
+
+    def _watch(self):
+        while True:
+            with self.lock:
+                if self.stopped:
+                    return
+                entries = list(self.inflight.values())
+            try:
+                if entries:
+                    self._check(entries)
+            except Exception as e:
+                logger.exception("Error checking transaction receipts")
+                with self.lock:
+                    self.error = e
+                    self.lock.notify_all()
+                return
+            with self.lock:
+                if not self.stopped:
+                    self.lock.wait(self.pollInterval)
+
+    def _check(self, entries):
+        mined = self.w3.eth.getTransactionCount(self.account.address, 'latest')
+        now = time.time()
+        if mined != self.headNonce:
+            # Time a transaction from when it reached the head of the queue
+            self.headNonce = mined
+            self.headSince = now
+        for entry in entries:
+            if entry.nonce >= mined:
+                # Only the lowest unmined nonce can be stuck on price
+                if entry.nonce == mined and now - max(entry.sentAt, self.headSince) > self.timeout:
+                    self._replace(entry)
+                continue
+            # Any of the versions we sent may have been the one mined
+            for txhash in reversed(entry.hashes):
+                receipt = self._receipt(txhash)
+                if receipt is not None:
+                    self._finish(entry, 'confirmed' if receipt.status == 1 else 'failed', txhash)
+                    break
+            else:
+                self._finish(entry, 'dropped', entry.hashes[-1])
+
+    def _finish(self, entry, status, txhash):
+        if status != 'confirmed':
+            logger.warning("Transaction %s with nonce %d %s", txhash.hex(), entry.nonce, status)
+        with self.lock:
+            del self.inflight[entry.nonce]
+            self.events.put((entry.tag, status, txhash))
+            self.lock.notify_all()
+
+    def _replace(self, entry):
+        gasPrice = int(entry.tx['gasPrice'] * self.bump) + 1
+        if self.maxGasPrice is not None and gasPrice > self.maxGasPrice:
+            if entry.tx['gasPrice'] >= self.maxGasPrice:
+                return
+            gasPrice = self.maxGasPrice
+        tx = dict(entry.tx, gasPrice=gasPrice)
+        try:
+            txhash = self._send_raw(tx)
+        except ValueError:
+            # e.g. 'replacement transaction underpriced' or 'nonce too low' if it was just mined; try again next time
+            logger.exception("Error replacing transaction with nonce %d", entry.nonce)
+            entry.sentAt = time.time()
+            return
+        logger.info("Replaced tx %s with %s at %.2f gwei", entry.hashes[-1].hex(), txhash.hex(), gasPrice / 1e9)
+        entry.tx = tx
+        entry.hashes.append(txhash)
+        entry.sentAt = time.time()
+        self.events.put((entry.tag, 'replaced', txhash))
@@ -0,0 +1,63 @@
+import unittest
+
+import codec
+from eth_abi import decode_abi, encode_abi
+from eth_utils import keccak
+
+LABELS = [keccak(i.to_bytes(8, 'big')) for i in range(5)]
+ADDRESS = '0x' + '12' * 20
+
+
+def unhex(data):
+    return bytes.fromhex(data[2:])
+
+
+class CodecTest(unittest.TestCase):
+    def test_name_expires_and_entries(self):
+        self.assertEqual(unhex(codec.name_expires(LABELS[0])), codec.NAME_EXPIRES + encode_abi(['uint256'], [int.from_bytes(LABELS[0], 'big')]))
+        self.assertEqual(unhex(codec.entries(LABELS[0])), codec.ENTRIES + encode_abi(['bytes32'], [LABELS[0]]))
+        with self.assertRaises(ValueError):
+            codec.name_expires(LABELS[0][:31])
+
+    def test_decode_results(self):
+        self.assertEqual(codec.decode_uint(encode_abi(['uint256'], [12345])), 12345)
+        entry = encode_abi(['uint8', 'address', 'uint256', 'uint256', 'uint256'], [2, ADDRESS, 3, 4, 5])
+        self.assertEqual(codec.decode_entry_mode(entry), 2)
+        with self.assertRaises(ValueError):
+            codec.decode_entry_mode(entry[:-1])
+
+    def test_migrate_all(self):
+        for labels in ([], LABELS[:1], LABELS):
+            data = unhex(codec.migrate_all(labels))
+            self.assertEqual(data[:4], codec.MIGRATE_ALL)
+            self.assertEqual(data[4:], encode_abi(['uint256[]'], [[int.from_bytes(label, 'big') for label in labels]]))
+            data = unhex(codec.migrate_all_legacy(labels))
+            self.assertEqual(data[:4], codec.MIGRATE_ALL_LEGACY)
+            self.assertEqual(decode_abi(['bytes32[]'], data[4:]), (tuple(labels),))
+
+    def test_aggregate(self):
+        calls = [
+            (ADDRESS, codec.name_expires(LABELS[0])),
+            ('0x' + '34' * 20, codec.entries(LABELS[1])),
+            # Calldata of a length that is not a multiple of 32 bytes must be padded
+            (ADDRESS, '0x12345678'),
+        ]
+        data = unhex(codec.aggregate(calls))
+        self.assertEqual(data[:4], codec.AGGREGATE)
+        self.assertEqual(data[4:], encode_abi(['(address,bytes)[]'], [[(address, unhex(calldata)) for address, calldata in calls]]))
+        # eth_abi pads empty values with a zero word that Solidity doesn't, so only compare what they decode to
+        calls.append((ADDRESS, '0x'))
+        self.assertEqual(decode_abi(['(address,bytes)[]'], unhex(codec.aggregate(calls))[4:]),
+            (tuple((address, unhex(calldata)) for address, calldata in calls),))
+        self.assertEqual(decode_abi(['(address,bytes)[]'], unhex(codec.aggregate([]))[4:]), ((),))
+
+    def test_decode_aggregate(self):
+        results = [encode_abi(['uint256'], [1]), b'', b'\x01\x02\x03', b'\xff' * 70]
+        self.assertEqual(codec.decode_aggregate(encode_abi(['uint256', 'bytes[]'], [100, results])), results)
+        self.assertEqual(codec.decode_aggregate(encode_abi(['uint256', 'bytes[]'], [100, []])), [])
+        with self.assertRaises(ValueError):
+            codec.decode_aggregate(encode_abi(['uint256', 'bytes[]'], [100, results])[:-32])
+
+
+if __name__ == '__main__':
+    unittest.main()
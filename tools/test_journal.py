@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+
+from hexbytes import HexBytes
+from journal import Journal
+
+
+def label(i):
+    return HexBytes(i.to_bytes(32, 'big'))
+
+
+class JournalTest(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+        self.journal = Journal(self.path)
+
+    def tearDown(self):
+        self.journal.close()
+        os.unlink(self.path)
+
+    def test_batch_lifecycle(self):
+        first = self.journal.add_batch('permanent', [label(1), label(2)], 10)
+        second = self.journal.add_batch('legacy', [label(3)])
+        self.assertEqual(self.journal.get_cursor(), 10)
+        self.assertEqual(self.journal.unconfirmed(), [
+            (first, 'permanent', [label(1), label(2)], None, None, 'pending'),
+            (second, 'legacy', [label(3)], None, None, 'pending'),
+        ])
+
+        self.journal.submitted(first, 0, HexBytes(b'\x01' * 32))
+        self.journal.replaced(first, HexBytes(b'\x02' * 32))
+        self.journal.submitted(second, 1, HexBytes(b'\x03' * 32))
+        self.assertEqual(self.journal.submitted_below(1), [(first, HexBytes(b'\x02' * 32))])
+        self.assertEqual(self.journal.submitted_from(1), [(second, HexBytes(b'\x03' * 32))])
+
+        self.journal.set_status(first, 'confirmed')
+        self.assertEqual(self.journal.unconfirmed(), [
+            (second, 'legacy', [label(3)], 1, HexBytes(b'\x03' * 32), 'submitted'),
+        ])
+        self.assertEqual(self.journal.counts(), {'confirmed': (1, 2), 'submitted': (1, 1)})
+
+    def test_supersede(self):
+        batchId = self.journal.add_batch('legacy', [label(1), label(2), label(3)])
+        self.journal.set_status(batchId, 'failed')
+        newIds = self.journal.supersede(batchId, [('legacy', [label(1)]), ('permanent', [label(3)])])
+        self.assertEqual(self.journal.unconfirmed(), [
+            (newIds[0], 'legacy', [label(1)], None, None, 'pending'),
+            (newIds[1], 'permanent', [label(3)], None, None, 'pending'),
+        ])
+        # A batch with nothing left to migrate is simply retired
+        self.assertEqual(self.journal.supersede(newIds[0], []), [])
+        self.assertEqual(self.journal.counts()['superseded'], (2, 4))
+
+    def test_owner_checks(self):
+        self.journal.check_source('/labels.txt')
+        self.journal.check_sender('0/1', '0xabc')
+        # Checking again with the same values is fine, including after reopening
+        self.journal.close()
+        self.journal = Journal(self.path)
+        self.journal.check_source('/labels.txt')
+        self.journal.check_sender('0/1', '0xabc')
+        with self.assertRaises(ValueError):
+            self.journal.check_source('/other.txt')
+        with self.assertRaises(ValueError):
+            self.journal.check_sender('1/2', '0xabc')
+        with self.assertRaises(ValueError):
+            self.journal.check_sender('0/1', '0xdef')
+
+
+if __name__ == '__main__':
+    unittest.main()
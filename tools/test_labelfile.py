@@ -0,0 +1,27 @@
+import io
+import tempfile
+import unittest
+
+from eth_utils import keccak
+from labelfile import LabelFile, pack, unpack
+
+
+class PackTest(unittest.TestCase):
+    def test_round_trip(self):
+        labels = [keccak(i.to_bytes(8, 'big')).hex() for i in range(10)]
+        with tempfile.TemporaryFile() as packed:
+            # Blank lines and 0x prefixes are accepted
+            self.assertEqual(pack(io.StringIO('0x' + '\n\n'.join(labels) + '\n'), packed), len(labels))
+            packed.flush()
+            labelFile = LabelFile(packed)
+            self.assertEqual([bytes(label).hex() for label in labelFile], labels)
+            labelFile.close()
+
+            packed.seek(0)
+            text = io.StringIO()
+            self.assertEqual(unpack(packed, text), len(labels))
+            self.assertEqual(text.getvalue(), ''.join(label + '\n' for label in labels))
+
+
+if __name__ == '__main__':
+    unittest.main()
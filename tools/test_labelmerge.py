@@ -0,0 +1,56 @@
+import csv
+import os
+import tempfile
+import unittest
+
+from get_names import append_new_rows
+from labelmerge import difference, sort_unique
+
+
+class SortUniqueTest(unittest.TestCase):
+    def test_lists_and_tuples_compare_equal(self):
+        rows = [['bb'], ('aa',), ('bb',), ['aa'], ('cc', 'name')]
+        expected = [('aa',), ('bb',), ('cc', 'name')]
+        self.assertEqual(list(sort_unique(rows)), expected)
+        # Spill every few rows to exercise the on-disk runs
+        self.assertEqual(list(sort_unique(rows, memory=1)), expected)
+
+    def test_difference(self):
+        rows = sort_unique([('aa',), ('bb',), ('cc',)])
+        exclude = sort_unique([['bb'], ['dd']], memory=1)
+        self.assertEqual(list(difference(rows, exclude)), [('aa',), ('cc',)])
+
+
+class AppendNewRowsTest(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+        with open(self.path, 'w', newline='') as f:
+            csv.writer(f).writerows([('aa',), ('bb',)])
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    def append(self, rows, memory):
+        with open(self.path, 'r+t', newline='') as f:
+            return append_new_rows(f, iter(rows), memory)
+
+    def read(self):
+        with open(self.path, newline='') as f:
+            return [tuple(row) for row in csv.reader(f)]
+
+    def check_append(self, memory):
+        self.assertEqual(self.append([('bb',), ('cc',), ('cc',), ('aa',)], memory), 1)
+        self.assertEqual(self.read(), [('aa',), ('bb',), ('cc',)])
+        self.assertEqual(self.append([('cc',), ('aa',)], memory), 0)
+        self.assertEqual(self.read(), [('aa',), ('bb',), ('cc',)])
+
+    def test_append_in_memory(self):
+        self.check_append(1024 * 1024)
+
+    def test_append_spilled(self):
+        self.check_append(2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,214 @@
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+
+import codec
+from eth_account import Account
+from eth_utils import keccak, to_checksum_address
+from journal import Journal
+import migrate
+from mocknode import MIGRATION_ADDRESS, MockNode, label_category, serve
+import web3
+
+KEY = '0x' + '11' * 32
+ACCOUNT = Account.from_key(KEY)
+GWEI = 1000000000
+TOOLS = os.path.dirname(os.path.abspath(__file__))
+
+
+class LabelListTest(unittest.TestCase):
+    def test_blank_lines_are_not_records(self):
+        labels = [keccak(i.to_bytes(8, 'big')) for i in range(3)]
+        with tempfile.TemporaryDirectory() as dir:
+            path = os.path.join(dir, 'labels.txt')
+            with open(path, 'w') as f:
+                f.write('\n'.join(label.hex() for label in labels).replace('\n', '\n\n  \n') + '\n\n')
+            self.assertEqual(migrate.count_labels(path), len(labels))
+            self.assertEqual(list(migrate.open_labels(path)), labels)
+            # Indexes, such as the journal cursor, count only records
+            self.assertEqual(list(migrate.open_labels(path, 2)), labels[2:])
+
+
+class NodeTestCase(unittest.TestCase):
+    """Serves a fresh MockNode for each test, with a label list and journal to migrate."""
+
+    def setUp(self):
+        self.node = MockNode()
+        self.server = serve(self.node, port=0)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://%s:%d' % self.server.server_address
+        self.dir = tempfile.TemporaryDirectory()
+        self.labels = [keccak(i.to_bytes(8, 'big')) for i in range(60)]
+        self.labelPath = os.path.join(self.dir.name, 'labels.txt')
+        with open(self.labelPath, 'w') as f:
+            f.writelines(label.hex() + '\n' for label in self.labels)
+        self.journalPath = os.path.join(self.dir.name, 'migration.journal')
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.dir.cleanup()
+
+    def labels_in(self, category):
+        return [label for label in self.labels if label_category(label) == category]
+
+    def open_journal(self):
+        """Returns the journal, owned by this label list and account as if by an earlier run."""
+        journal = Journal(self.journalPath)
+        journal.check_source(os.path.abspath(self.labelPath))
+        journal.check_sender('0/1', ACCOUNT.address)
+        return journal
+
+    def sign(self, nonce, labels, gasPrice=GWEI):
+        return ACCOUNT.sign_transaction({
+            'nonce': nonce,
+            'gasPrice': gasPrice,
+            'gas': 1000000,
+            'to': to_checksum_address(MIGRATION_ADDRESS),
+            'value': 0,
+            'data': codec.migrate_all(labels),
+            'chainId': 1337,
+        })
+
+    def broadcast(self, signed):
+        response = self.node.handle({'id': 1, 'method': 'eth_sendRawTransaction', 'params': ['0x' + bytes(signed.rawTransaction).hex()]})
+        self.assertNotIn('error', response)
+
+    def run_migrate(self, *args):
+        result = subprocess.run(
+            [sys.executable, 'migrate.py', '--privatekey', KEY, to_checksum_address(MIGRATION_ADDRESS), self.labelPath,
+             'migrate', '--journal', self.journalPath, '--batchsize', '10', '--replaceafter', '1'] + list(args),
+            cwd=TOOLS, env=dict(os.environ, WEB3_PROVIDER_URI=self.url),
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True, timeout=120)
+        return result.returncode, result.stdout
+
+    def assertMigrated(self, labels):
+        self.assertEqual([label for label in labels if self.node.category(label) != 'migrated'], [])
+
+    def assertAllMigrated(self):
+        self.assertMigrated(self.labels_in('permanent') + self.labels_in('legacy'))
+
+
+class MigrateRestartTest(NodeTestCase):
+    def test_resumes_from_cursor(self):
+        journal = self.open_journal()
+        journal.set_cursor(30)
+        journal.close()
+        code, output = self.run_migrate()
+        self.assertEqual(code, 0, output)
+        for label in self.labels[:30]:
+            self.assertEqual(self.node.category(label), label_category(label))
+        self.assertMigrated([label for label in self.labels[30:] if label_category(label) in ('permanent', 'legacy')])
+        journal = Journal(self.journalPath)
+        self.assertEqual(journal.get_cursor(), len(self.labels))
+        self.assertEqual(journal.unconfirmed(), [])
+        journal.close()
+
+    def test_crash_before_broadcast(self):
+        # The batch was journaled as submitted, but never reached the node
+        labels = self.labels_in('permanent')
+        journal = self.open_journal()
+        batchId = journal.add_batch('permanent', labels, len(self.labels))
+        journal.submitted(batchId, 0, self.sign(0, labels).hash)
+        journal.close()
+        code, output = self.run_migrate()
+        self.assertEqual(code, 0, output)
+        self.assertIn("was never sent", output)
+        self.assertMigrated(labels)
+        journal = Journal(self.journalPath)
+        self.assertEqual(journal.counts(), {'superseded': (1, len(labels)), 'confirmed': (1, len(labels))})
+        journal.close()
+
+    def test_replacement_mined(self):
+        # A replacement was mined, but the run stopped before journaling its hash
+        labels = self.labels_in('permanent')
+        journal = self.open_journal()
+        batchId = journal.add_batch('permanent', labels, len(self.labels))
+        journal.submitted(batchId, 0, self.sign(0, labels).hash)
+        journal.close()
+        self.broadcast(self.sign(0, labels, 2 * GWEI))
+        code, output = self.run_migrate()
+        self.assertEqual(code, 0, output)
+        self.assertMigrated(labels)
+        # Nothing was left to resend
+        self.assertEqual(self.node.nonces[ACCOUNT.address], 1)
+        journal = Journal(self.journalPath)
+        self.assertEqual(journal.counts(), {'superseded': (1, len(labels))})
+        journal.close()
+
+    def test_reverted_batch(self):
+        stuck = self.labels_in('legacy')[0]
+        self.node.reverting.add(stuck)
+        code, output = self.run_migrate('--retries', '1')
+        self.assertEqual(code, 1, output)
+        self.assertIn("remain unconfirmed", output)
+        self.assertMigrated(self.labels_in('permanent'))
+
+        # The name has since moved to the permanent registrar, and no longer reverts
+        self.node.reverting.clear()
+        self.node.categories[stuck] = 'permanent'
+        code, output = self.run_migrate()
+        self.assertEqual(code, 0, output)
+        self.assertIn("as permanent names", output)
+        self.assertAllMigrated()
+
+    def test_stuck_transaction_replaced_on_restart(self):
+        labels = self.labels_in('permanent')
+        journal = self.open_journal()
+        batchId = journal.add_batch('permanent', labels, len(self.labels))
+        signed = self.sign(0, labels)
+        journal.submitted(batchId, 0, signed.hash)
+        journal.close()
+        self.node.minGasPrice = GWEI + 1
+        self.broadcast(signed)
+        code, output = self.run_migrate('--gasprice', '1')
+        self.assertEqual(code, 0, output)
+        self.assertIn("Tracking unmined batch", output)
+        self.assertMigrated(labels)
+        journal = Journal(self.journalPath)
+        self.assertEqual(journal.counts(), {'confirmed': (1, len(labels))})
+        journal.close()
+
+
+class UpdateConfirmationsTest(NodeTestCase):
+    def setUp(self):
+        super().setUp()
+        migrate.w3.provider = web3.HTTPProvider(self.url)
+        migrate.journal = self.open_journal()
+
+    def tearDown(self):
+        migrate.journal.close()
+        migrate.journal = None
+        super().tearDown()
+
+    def submit(self, nonce, labels, send=True):
+        batchId = migrate.journal.add_batch('permanent', labels)
+        signed = self.sign(nonce, labels)
+        migrate.journal.submitted(batchId, nonce, signed.hash)
+        if send:
+            self.broadcast(signed)
+        return batchId
+
+    def test_statuses(self):
+        labels = self.labels_in('permanent')
+        confirmed = self.submit(0, labels[:2])
+        self.node.reverting.add(labels[2])
+        failed = self.submit(1, labels[2:4])
+        replaced = self.submit(2, labels[4:6], send=False)
+        self.broadcast(self.sign(2, labels[4:6], 2 * GWEI))
+        neverSent = self.submit(3, labels[6:8], send=False)
+        # Waiting behind the nonce that was never sent
+        pending = self.submit(4, labels[8:10])
+
+        self.assertEqual(migrate.update_confirmations(ACCOUNT), 3)
+        statuses = {batchId: status for batchId, kind, labels, nonce, txhash, status in migrate.journal.unconfirmed()}
+        self.assertNotIn(confirmed, statuses)
+        self.assertEqual(statuses, {failed: 'failed', replaced: 'dropped', neverSent: 'dropped', pending: 'submitted'})
+        self.assertEqual(migrate.journal.counts()['confirmed'], (1, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
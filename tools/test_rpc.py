@@ -0,0 +1,83 @@
+import asyncio
+import itertools
+import threading
+import time
+import unittest
+
+import codec
+from eth_utils import keccak
+from mocknode import BASE_REGISTRAR_ADDRESS, MockNode, label_category, serve
+from rpc import Fetcher, RPCError
+
+
+async def expiry(rpc, label):
+    return codec.decode_uint(await rpc.call(BASE_REGISTRAR_ADDRESS, codec.name_expires(label)))
+
+
+class FetcherTest(unittest.TestCase):
+    def setUp(self):
+        # Jitter makes responses arrive out of order
+        self.node = MockNode(latency=0.01, jitter=0.01)
+        self.server = serve(self.node, port=0)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://%s:%d' % self.server.server_address
+        self.labels = [keccak(i.to_bytes(8, 'big')) for i in range(100)]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_results_in_input_order(self):
+        fetcher = Fetcher(self.url, 10)
+        expected = [self.node.expires if label_category(label) == 'permanent' else 0 for label in self.labels]
+        self.assertEqual(list(fetcher.imap(expiry, self.labels)), expected)
+
+    def test_window_bounds_read_ahead(self):
+        read = []
+        def items():
+            for label in self.labels:
+                read.append(label)
+                yield label
+        fetcher = Fetcher(self.url, 2, window=4)
+        results = fetcher.imap(expiry, items())
+        next(results)
+        time.sleep(0.3)
+        # At most a window of results waiting to be read and a window in flight
+        self.assertLessEqual(len(read), 2 * 4 + 2)
+        self.assertEqual(len(list(results)), len(self.labels) - 1)
+
+    def test_errors_propagate(self):
+        async def func(rpc, i):
+            if i == 3:
+                # No such function on the registrar
+                return await rpc.call(BASE_REGISTRAR_ADDRESS, '0x12345678')
+            return i
+        results = Fetcher(self.url, 4).imap(func, range(10))
+        self.assertEqual([next(results) for i in range(3)], [0, 1, 2])
+        with self.assertRaises(RPCError):
+            next(results)
+
+    def test_stopping_early_cancels_requests(self):
+        cancelled = []
+        async def func(rpc, i):
+            if i < 3:
+                return i
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.append(i)
+                raise
+        threads = threading.active_count()
+        results = Fetcher(self.url, 4).imap(func, itertools.count())
+        self.assertEqual([next(results) for i in range(3)], [0, 1, 2])
+        results.close()
+        for i in range(100):
+            if threading.active_count() == threads:
+                break
+            time.sleep(0.02)
+        self.assertEqual(threading.active_count(), threads)
+        self.assertTrue(cancelled)
+
+
+if __name__ == '__main__':
+    unittest.main()
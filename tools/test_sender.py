@@ -0,0 +1,122 @@
+import threading
+import time
+import unittest
+
+import codec
+from eth_account import Account
+from eth_utils import keccak, to_checksum_address
+from mocknode import MIGRATION_ADDRESS, MockNode, serve
+from sender import TransactionSender
+import web3
+
+ACCOUNT = Account.from_key('0x' + '11' * 32)
+GWEI = 1000000000
+
+
+class MigrateCall:
+    """Stands in for a contract function, migrating `labels`."""
+
+    def __init__(self, labels):
+        self.labels = labels
+
+    def buildTransaction(self, params):
+        return dict(params, to=to_checksum_address(MIGRATION_ADDRESS), value=0, gas=params.get('gas', 1000000),
+            data=codec.migrate_all(self.labels), chainId=1337)
+
+
+def hexstr(txhash):
+    return '0x' + bytes(txhash).hex()
+
+
+def label(i):
+    # A last byte of 1 puts the label on the permanent registrar
+    return keccak(i.to_bytes(8, 'big'))[:31] + b'\x01'
+
+
+class TransactionSenderTest(unittest.TestCase):
+    def setUp(self):
+        self.node = MockNode()
+        self.server = serve(self.node, port=0)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.w3 = web3.Web3(web3.HTTPProvider('http://%s:%d' % self.server.server_address))
+        self.events = []
+        self.sender = None
+
+    def tearDown(self):
+        if self.sender is not None:
+            self.sender.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def make_sender(self, **kwargs):
+        kwargs.setdefault('pollInterval', 0.05)
+        self.sender = TransactionSender(self.w3, ACCOUNT, 0, GWEI, lambda *event: self.events.append(event), **kwargs)
+        return self.sender
+
+    def test_nonces(self):
+        sender = self.make_sender()
+        self.assertEqual(sender.send(MigrateCall([label(1)]), 'a')[0], 0)
+        self.assertEqual(sender.send(MigrateCall([label(2)]), 'b')[0], 1)
+        sender.wait()
+        self.assertEqual(self.node.nonces[ACCOUNT.address], 2)
+        # Only nonces the sender has already handed out can be tracked
+        with self.assertRaises(ValueError):
+            sender.track('c', 2, {}, b'\0' * 32)
+
+    def test_window_blocks_send(self):
+        self.node.minGasPrice = 2 * GWEI
+        sender = self.make_sender(window=2, timeout=60)
+        sender.send(MigrateCall([label(1)]), 'a')
+        sender.send(MigrateCall([label(2)]), 'b')
+        third = threading.Thread(target=sender.send, args=(MigrateCall([label(3)]), 'c'))
+        third.start()
+        time.sleep(0.3)
+        self.assertTrue(third.is_alive())
+        self.assertEqual(sender.pending(), 2)
+
+        self.node.minGasPrice = 0
+        self.node.mine()
+        third.join(5)
+        self.assertFalse(third.is_alive())
+        sender.wait()
+        self.assertEqual(self.node.nonces[ACCOUNT.address], 3)
+
+    def test_replaces_head_at_same_nonce(self):
+        self.node.minGasPrice = int(1.2 * GWEI)
+        sender = self.make_sender(timeout=0.2)
+        firstNonce, firstHash = sender.send(MigrateCall([label(1)]), 'a')
+        sender.send(MigrateCall([label(2)]), 'b')
+        sender.wait()
+
+        replaced = [(tag, txhash) for tag, status, txhash in self.events if status == 'replaced']
+        # 1 gwei is bumped twice to pass 1.2 gwei, one transaction at a time
+        self.assertEqual([tag for tag, txhash in replaced], ['a', 'a', 'b', 'b'])
+        confirmed = {tag: txhash for tag, status, txhash in self.events if status == 'confirmed'}
+        self.assertEqual(confirmed, {'a': replaced[1][1], 'b': replaced[3][1]})
+        self.assertEqual(int(self.node.transactions[hexstr(confirmed['a'])]['nonce'], 16), firstNonce)
+        # The node forgets a transaction once it is replaced
+        self.assertNotIn(hexstr(firstHash), self.node.transactions)
+        self.assertNotIn(hexstr(replaced[0][1]), self.node.transactions)
+
+    def test_outcomes(self):
+        self.node.reverting.add(label(2))
+        sender = self.make_sender(timeout=60)
+        sender.send(MigrateCall([label(1)]), 'confirmed')
+        sender.send(MigrateCall([label(2)]), 'failed')
+        sender.wait()
+
+        # Another transaction takes the nonce of one still waiting for its price
+        self.node.minGasPrice = 2 * GWEI
+        sender.send(MigrateCall([label(3)]), 'dropped')
+        competitor = ACCOUNT.sign_transaction(MigrateCall([label(4)]).buildTransaction({'nonce': 2, 'gasPrice': 2 * GWEI}))
+        self.w3.eth.sendRawTransaction(competitor.rawTransaction)
+        sender.wait()
+
+        self.assertEqual([(tag, status) for tag, status, txhash in self.events],
+            [('confirmed', 'confirmed'), ('failed', 'failed'), ('dropped', 'dropped')])
+        self.assertEqual(self.node.category(label(1)), 'migrated')
+        self.assertEqual(self.node.category(label(2)), 'permanent')
+
+
+if __name__ == '__main__':
+    unittest.main()